@@ -0,0 +1,86 @@
+import functools
+
+import pygame
+
+# Every sprite is loaded and scale2x'd once here and shared by the game, the trainer and the replay viewer.
+# Nothing is loaded at import: the sprites, masks and the font are loaded the first time something asks for them,
+# so headless training, worker processes and tools that never draw don't pay for them or need a display.
+# Sprites are read as module attributes (assets.BG_IMG) or through Asset on classes that draw them
+
+FONT = 'Pixeltype.ttf'
+FONT_SIZE = 50
+
+
+def load(name):
+    return pygame.transform.scale2x(pygame.image.load(f'imgs/{name}.png'))
+
+
+def load_all():
+    bird_imgs = [load('bird1'), load('bird2'), load('bird3')]
+    pipe_img = load('pipe')
+    pipe_top_img = pygame.transform.flip(pipe_img, False, True)
+
+    return {
+        'BIRD_IMGS': bird_imgs,
+        'PIPE_IMG': pipe_img,
+        'PIPE_TOP_IMG': pipe_top_img,
+        'GROUND_IMG': load('base'),
+        'BG_IMG': load('bg'),
+        'BIRD_MASKS': [pygame.mask.from_surface(img) for img in bird_imgs],
+        'PIPE_TOP_MASK': pygame.mask.from_surface(pipe_top_img),
+        'PIPE_BOTTOM_MASK': pygame.mask.from_surface(pipe_img),
+    }
+
+
+NAMES = ('BIRD_IMGS', 'PIPE_IMG', 'PIPE_TOP_IMG', 'GROUND_IMG', 'BG_IMG', 'BIRD_MASKS', 'PIPE_TOP_MASK',
+         'PIPE_BOTTOM_MASK')
+
+
+def loaded():
+    return 'BG_IMG' in globals()
+
+
+def sprite(name):
+    # The first sprite asked for loads all of them into the module
+    if not loaded():
+        globals().update(load_all())
+
+    return globals()[name]
+
+
+def __getattr__(name):
+    # Only called for names not defined yet
+    if name not in NAMES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    return sprite(name)
+
+
+class Asset:
+    # Class attribute that reads a sprite from this module when it is first used, instead of when the class is defined
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        return sprite(self.name)
+
+
+@functools.lru_cache(maxsize=None)
+def font():
+    pygame.font.init()
+    return pygame.font.Font(FONT, FONT_SIZE)
+
+
+def open_window(width, height, caption='Flappy Bird'):
+    pygame.init()
+    win = pygame.display.set_mode((width, height))
+    pygame.display.set_caption(caption)
+    return win
+
+
+# A bird's tilt only ever takes a handful of values (MAX_ROTATION, then ROT_VEL steps down to about -90), so every
+# rotated frame a game can need fits in a small cache
+@functools.lru_cache(maxsize=64)
+def rotated_bird(frame, tilt):
+    return pygame.transform.rotate(sprite('BIRD_IMGS')[frame], tilt)
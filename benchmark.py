@@ -0,0 +1,318 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import neat
+import numpy as np
+
+import engine
+
+# Throughput benchmarks for the training hot path. Everything runs on fixed seeds so numbers from two runs, or from two
+# versions of the engine, measure the same work. Results are written as JSON and can be compared with a stored baseline:
+#
+#   python benchmark.py --output bench.json
+#   python benchmark.py --compare bench.json
+
+SIZES = [10, 100, 1000, 10000]
+SEED = 1234
+COURSE = 99
+GAME_FRAMES = 300
+
+
+def load_config(config_path, size):
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                                neat.DefaultStagnation, config_path)
+    config.pop_size = size
+    return config
+
+
+def make_genomes(config, size, mutations=5):
+    # Fresh genomes mutated a few times, so the networks have hidden nodes like the ones found in later generations
+    random.seed(SEED)
+    genomes = []
+    for key in range(size):
+        g = config.genome_type(key)
+        g.configure_new(config.genome_config)
+        for _ in range(mutations):
+            g.mutate(config.genome_config)
+        genomes.append(g)
+
+    return genomes
+
+
+def scripted_decider(size):
+    # A fixed policy that keeps most birds alive for a while: jump when closer to the bottom pipe than the top one,
+    # with a per-bird margin so the population spreads out
+    margin = np.random.RandomState(SEED).uniform(-40, 40, size)
+
+    def decide(inputs, index):
+        return inputs[:, 2] + margin[index] < inputs[:, 1]
+
+    return decide
+
+
+def rate(fn, count, min_time=0.5):
+    # Runs fn until at least min_time has passed and returns how many units of count per second it did
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return runs * count / elapsed
+
+
+def bench_game_step(config, size):
+    game = engine.Game(size, course=COURSE, policy=engine.TerminationPolicy(max_score=None))
+    decide = scripted_decider(size)
+    alive = 0
+    start = time.perf_counter()
+    while game.frame < GAME_FRAMES and not game.over():
+        alive += int(game.birds.alive.sum())
+        game.step(decide)
+
+    elapsed = time.perf_counter() - start
+    return {'frames_per_s': game.frame / elapsed, 'bird_frames_per_s': alive / elapsed}
+
+
+def bench_env_step(config, size):
+    import env
+
+    vec = env.VectorFlappyEnv(size, policy=engine.TerminationPolicy(max_score=None))
+    margin = np.random.RandomState(SEED).uniform(-40, 40, size)
+    observation, _ = vec.reset(COURSE)
+    start = time.perf_counter()
+    while vec.game.frame < GAME_FRAMES and not vec.done():
+        observation, _, _, _, _ = vec.step(observation[:, 2] + margin < observation[:, 1])
+
+    elapsed = time.perf_counter() - start
+    return {'env_steps_per_s': vec.game.frame / elapsed, 'env_bird_steps_per_s': vec.game.lifetimes.sum() / elapsed}
+
+
+SCHEDULE_INTERVALS = [1, 2, 4, 8]
+
+
+def bench_schedule(config, size):
+    # What asking the deciders less often costs: the mean fitness of the scripted birds and the share of decisions they
+    # were asked for, for every interval of engine.DecisionScheduler
+    result = {}
+    for every in SCHEDULE_INTERVALS:
+        policy = engine.TerminationPolicy(max_score=None, frame_budget=GAME_FRAMES)
+        game = engine.Game(size, course=COURSE, policy=policy)
+        decide = engine.DecisionScheduler(game, scripted_decider(size), every)
+        while not game.over():
+            game.step(decide)
+
+        result[f'fitness_every_{every}'] = float(game.fitness.mean())
+        result[f'query_rate_every_{every}'] = decide.query_rate()
+
+    return result
+
+
+def bench_collide(config, size):
+    import collision
+    import sprites
+
+    pipe = sprites.Pipe(engine.BIRD_X + 10, 300)
+    ys = np.random.RandomState(SEED).uniform(0, engine.GROUND_Y - engine.BIRD_HEIGHT, size)
+
+    result = {'batched_checks_per_s': rate(lambda: collision.collide(pipe, ys), size)}
+
+    # The per-object mask path is slow enough that a smaller sample gives the same rate
+    birds = [sprites.Bird(engine.BIRD_X, y) for y in ys[:1000]]
+
+    def collide_each():
+        for bird in birds:
+            pipe.collide(bird)
+
+    result['pipe_collide_calls_per_s'] = rate(collide_each, len(birds))
+    return result
+
+
+def bench_activate(config, size):
+    import network
+
+    genomes = make_genomes(config, size)
+    inputs = np.random.RandomState(SEED).uniform(0, 700, (size, 3))
+
+    batch = network.BatchNetwork.create(genomes, config)
+    result = {'batched_activations_per_s': rate(lambda: batch.activate(inputs), size)}
+
+    nets = [neat.nn.FeedForwardNetwork.create(g, config) for g in genomes[:1000]]
+    rows = inputs.tolist()
+
+    def activate_each():
+        for net, row in zip(nets, rows):
+            net.activate(row)
+
+    result['activations_per_s'] = rate(activate_each, len(nets))
+    return result
+
+
+def bench_generation(config, size):
+    import collision
+    import flappy_bird_ai
+
+    # Build the collision tables up front so the first size measured doesn't pay for them
+    collision.bird_hitbox()
+    collision.pipe_hitboxes()
+
+    genomes = list(enumerate(make_genomes(config, size)))
+    flappy_bird_ai.HEADLESS = True
+    flappy_bird_ai.WATCH_EVERY = 0
+    flappy_bird_ai.SEED = COURSE
+    flappy_bird_ai.GEN = 0
+
+    start = time.perf_counter()
+    flappy_bird_ai.main(genomes, config)
+    return {'generation_s': time.perf_counter() - start}
+
+
+def bench_draw(config, size):
+    import pygame
+    import flappy_bird_ai
+    import viewer
+    from sprites import Bird, Ground
+
+    win = pygame.display.set_mode((flappy_bird_ai.WIN_WIDTH, flappy_bird_ai.WIN_HEIGHT))
+    game = engine.Game(size, ground_type=Ground, course=COURSE, policy=engine.TerminationPolicy(max_score=None))
+    birds = [Bird(engine.BIRD_X, engine.BIRD_START_Y) for _ in range(size)]
+    # Spread the birds over the screen so every one of them gets drawn
+    game.birds.y[:] = np.random.RandomState(SEED).uniform(0, engine.GROUND_Y - engine.BIRD_HEIGHT, size)
+
+    snapshot = viewer.snapshot(game, 1)
+    return {'draws_per_s': rate(lambda: flappy_bird_ai.draw_window(win, snapshot, birds), 1)}
+
+
+BENCHMARKS = {
+    'game_step': bench_game_step,
+    'env_step': bench_env_step,
+    'schedule': bench_schedule,
+    'collide': bench_collide,
+    'activate': bench_activate,
+    'generation': bench_generation,
+    'draw_window': bench_draw,
+}
+
+# Everything is a rate where higher is better, except wall times and the share of decisions asked for
+LOWER_IS_BETTER = {'generation_s'} | {f'query_rate_every_{every}' for every in SCHEDULE_INTERVALS}
+
+# The entry points have to import within this budget, without loading sprites or the font and without touching the
+# display or audio, so worker processes and headless tools start quickly. Checked with --check-imports
+IMPORT_BUDGET_S = 1.0
+IMPORT_MODULES = ['flappy_bird_ai', 'best_bird', 'flappy_bird', 'champions', 'evaluation', 'env']
+IMPORT_PROBE = '''
+import time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+import assets, pygame
+print(elapsed, assets.loaded(), assets.font.cache_info().currsize > 0, pygame.display.get_init(),
+      pygame.mixer.get_init() is not None)
+'''
+
+
+def run(config_path, sizes, names):
+    results = {}
+    for name in names:
+        results[name] = {}
+        for size in sizes:
+            config = load_config(config_path, size)
+            results[name][str(size)] = metrics = BENCHMARKS[name](config, size)
+            print(f'{name:12} {size:>6}  ' + '  '.join(f'{k}={v:.4g}' for k, v in metrics.items()), flush=True)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': SEED,
+            'course': COURSE,
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    # Prints every metric next to its baseline and returns the ones that got worse by more than tolerance
+    regressions = []
+    for name, by_size in report['results'].items():
+        for size, metrics in by_size.items():
+            for metric, value in metrics.items():
+                try:
+                    old = baseline['results'][name][size][metric]
+                except KeyError:
+                    continue
+
+                change = (value - old) / old if old else 0.0
+                if metric in LOWER_IS_BETTER:
+                    change = -change
+
+                flag = ''
+                if change < -tolerance:
+                    flag = '  REGRESSION'
+                    regressions.append((name, size, metric))
+
+                print(f'{name:12} {size:>6}  {metric:28} {old:12.4g} -> {value:12.4g}  {change:+7.1%}{flag}')
+
+    return regressions
+
+
+def check_imports(budget=IMPORT_BUDGET_S):
+    # Imports every entry point in a fresh interpreter and returns the ones that took longer than budget or loaded
+    # anything at import
+    failures = []
+    for module in IMPORT_MODULES:
+        probe = subprocess.run([sys.executable, '-c', IMPORT_PROBE.format(module=module)], capture_output=True,
+                               text=True, check=True, env=dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1'))
+        elapsed, *flags = probe.stdout.split()
+        loaded = [name for name, flag in zip(['sprites', 'font', 'display', 'mixer'], flags) if flag == 'True']
+
+        failed = float(elapsed) > budget or loaded
+        if failed:
+            failures.append(module)
+
+        print(f'import {module:16} {float(elapsed):6.3f}s' + (f'  loads {", ".join(loaded)}' if loaded else '') +
+              ('  FAIL' if failed else ''))
+
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark simulation, collision, inference and rendering throughput')
+    parser.add_argument('--config', default='config.txt')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='population sizes to benchmark')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare against a stored JSON result')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown against the baseline before it counts as a regression')
+    parser.add_argument('--check-imports', action='store_true',
+                        help='only check that the entry points import quickly and without loading any assets')
+    args = parser.parse_args()
+
+    if args.check_imports:
+        sys.exit(1 if check_imports() else 0)
+
+    # draw_window needs a display surface, the dummy driver gives one without opening a window
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+    report = run(args.config, args.sizes, args.only)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        if compare(report, baseline, args.tolerance):
+            sys.exit(1)
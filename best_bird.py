@@ -1,192 +1,44 @@
+import argparse
+import os
 import pygame
-import random
+import assets
+import controls
+import engine
+import network
+import replay
+from sprites import Bird, Pipe, Ground, draw_pipes
 import neat
 import pickle
 
 WIN_WIDTH = 500
 WIN_HEIGHT = 750
 
-BIRD_IMGS = [pygame.transform.scale2x(pygame.image.load('imgs/bird1.png')),
-             pygame.transform.scale2x(pygame.image.load('imgs/bird2.png')),
-             pygame.transform.scale2x(pygame.image.load('imgs/bird3.png'))]
-
-PIPE_IMG = pygame.transform.scale2x(pygame.image.load('imgs/pipe.png'))
-GROUND_IMG = pygame.transform.scale2x(pygame.image.load('imgs/base.png'))
-BG_IMG = pygame.transform.scale2x(pygame.image.load('imgs/bg.png'))
-
-pygame.init()
-font = pygame.font.Font('Pixeltype.ttf', 50)
-
-
-class Bird:
-    IMGS = BIRD_IMGS
-    MAX_ROTATION = 25
-    ROT_VEL = 20
-    ANIMATION_RATE = 0.7
-
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.tilt = 0
-        self.tick_count = 0
-        self.vel = 0
-        self.height = self.y
-        self.img_index = 0
-        self.reverse_animate = False
-        self.img = self.IMGS[0]
-        self.isAlive = True
-
-    def jump(self):
-        self.vel = -10.5
-        self.tick_count = 0
-        self.height = self.y
-
-    def move(self):
-        self.tick_count += 1
-        d = self.vel * self.tick_count + 1.5 * self.tick_count ** 2
-
-        if d >= 16:
-            d = 16
-
-        if d < 0:
-            d -= 2
-
-        self.y += d
-
-        if d < 0 or self.y < self.height + 50:
-            if self.tilt < self.MAX_ROTATION:
-                self.tilt = self.MAX_ROTATION
-
-        else:
-            if self.tilt > -90:
-                self.tilt -= self.ROT_VEL
-
-    def draw(self, win):
-        if self.reverse_animate:
-            self.img_index -= self.ANIMATION_RATE
-        else:
-            self.img_index += self.ANIMATION_RATE
-
-        if self.img_index >= 3:
-            self.reverse_animate = True
-            self.img_index = 2
-
-        elif self.img_index <= 0:
-            self.reverse_animate = False
-            self.img_index = 0
-
-        self.img = self.IMGS[int(self.img_index)]
-
-        if self.tilt <= -80:
-            self.img = self.IMGS[2]
-            self.img_index = 2
-
-        rotated_image = pygame.transform.rotate(self.img, self.tilt)
-        new_rect = rotated_image.get_rect(center=self.img.get_rect(topleft=(self.x, self.y)).center)
-        win.blit(rotated_image, new_rect.topleft)
-
-    def get_mask(self):
-        return pygame.mask.from_surface(self.img)
-
-
-class Pipe:
-    GAP = 200
-    VEL = 5
-
-    def __init__(self, x):
-        self.x = x
-        self.height = 0
-        self.passed = False  # Denotes whether the bird has passed the pipe or not
-        self.top_pipe_pos = 0
-        self.bottom_pipe_pos = 0
-
-        self.PIPE_TOP = pygame.transform.flip(PIPE_IMG, False, True)
-        self.PIPE_BOTTOM = PIPE_IMG
-        self.set_height()
-
-    def set_height(self):
-        self.height = random.randrange(50, 450)
-        self.top_pipe_pos = self.height - self.PIPE_TOP.get_height()
-        self.bottom_pipe_pos = self.height + self.GAP
-
-    def move(self):
-        self.x -= self.VEL
-
-    def draw(self, win):
-        win.blit(self.PIPE_TOP, (self.x, self.top_pipe_pos))
-        win.blit(self.PIPE_BOTTOM, (self.x, self.bottom_pipe_pos))
-
-    def collide(self, bird):
-        bird_mask = bird.get_mask()
-        top_mask = pygame.mask.from_surface(self.PIPE_TOP)
-        bottom_mask = pygame.mask.from_surface(self.PIPE_BOTTOM)
-
-        top_offset = (self.x - bird.x, self.top_pipe_pos - round(bird.y))
-        bottom_offset = (self.x - bird.x, self.bottom_pipe_pos - round(bird.y))
-
-        # Returns None if there is no collision between bird mask and top mask
-        t_point = bird_mask.overlap(top_mask, top_offset)
-        b_point = bird_mask.overlap(bottom_mask, bottom_offset)
-
-        if t_point or b_point:
-            return True
-
-        return False
-
-
-class Ground:
-    VEL = 5
-    WIDTH = GROUND_IMG.get_width()
-    IMG = GROUND_IMG
-
-    def __init__(self, y):
-        self.y = y
-        self.x1 = 0
-        self.x2 = self.WIDTH
-
-    def move(self):
-        self.x1 -= self.VEL
-        self.x2 -= self.VEL
-
-        # x1 and x2 represent 2 ground images. Once one of them gets off-screen we put that one behind the other one
-        # Works kind of like Recycler View in order to create infinite ground
-
-        if self.x1 + self.WIDTH < 0:
-            self.x1 = self.x2 + self.WIDTH
-
-        if self.x2 + self.WIDTH < 0:
-            self.x2 = self.x1 + self.WIDTH
-
-    def draw(self, win):
-        win.blit(self.IMG, (self.x1, self.y))
-        win.blit(self.IMG, (self.x2, self.y))
+# LEFT and RIGHT seek this many frames back and forward while watching a replay, SPACE pauses
+SEEK_FRAMES = 10 * controls.FPS
 
 
 def draw_window(win, bird, pipes, ground, score):
-    win.blit(BG_IMG, (0, 0))
+    font = assets.font()
+    win.blit(assets.BG_IMG, (0, 0))
 
-    for pipe in pipes:
-        pipe.draw(win)
+    draw_pipes(win, pipes)
 
     score_text = font.render(f'Score: {score}', False, (255, 255, 255))
     win.blit(score_text, (WIN_WIDTH - 10 - score_text.get_width(), 10))
 
     bird.draw(win)
 
-    pipe_index = 0
-    if len(pipes) > 1 and bird.x > pipes[0].x + pipes[0].PIPE_TOP.get_width():
-        pipe_index = 1
-
+    s = pipes.ahead(bird.x)
     pygame.draw.line(win, (255, 255, 255), (200 + bird.img.get_width(), bird.y),
-                     (pipes[pipe_index].x, pipes[pipe_index].height), 3)
+                     (pipes.x[s], pipes.height[s, 0]), 3)
     pygame.draw.line(win, (255, 255, 255), (200 + bird.img.get_width(), bird.y),
-                     (pipes[pipe_index].x, pipes[pipe_index].bottom_pipe_pos), 3)
+                     (pipes.x[s], pipes.height[s, 0] + Pipe.GAP), 3)
 
     ground.draw(win)
-    pygame.display.update()
 
 
 def game_over_screen(win, score):
+    font = assets.font()
     win.fill((0, 0, 0))
 
     game_over_text = font.render('Game Over !', False, (255, 255, 255))
@@ -195,83 +47,176 @@ def game_over_screen(win, score):
     win.blit(game_over_text, (WIN_WIDTH / 2 - game_over_text.get_width() / 2, WIN_HEIGHT / 2 - 50))
     win.blit(score_text, (WIN_WIDTH / 2 - score_text.get_width() / 2, WIN_HEIGHT / 2))
 
-    pygame.display.update()
+
+def draw_game(win, bird, game):
+    bird.y = game.birds.y[0]
+    bird.tilt = game.birds.tilt[0]
+    draw_window(win, bird, game.pipes, game.ground, game.score)
+
+
+def new_game(course):
+    # The bird plays by the same rules as in training, just without the score cap
+    return engine.Game(1, ground_type=Ground, course=course,
+                       policy=engine.TerminationPolicy(max_score=None))
 
 
-def main(genome, config):
-    neural_network = neat.nn.FeedForwardNetwork.create(genome, config)
+def main(genome, config, course=None, record=None, schedule=None):
+    # With record set the game is saved as a replay to that file once the bird dies or the window is closed.
+    # schedule optionally holds the arguments of an engine.DecisionScheduler deciding when the network is asked
+    if not isinstance(course, engine.Course):
+        course = engine.Course(course)
 
-    bird = Bird(200, 280)
-    pipes = [Pipe(600)]
-    ground = Ground(680)
-    score = 0
-    win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
-    pygame.display.set_caption('Flappy Bird')
+    print(f'Course seed: {course.seed}')
+
+    game = new_game(course)
+    recorder = replay.Recorder(game)
+    decide = engine.DecisionScheduler.wrap(game, network.BatchNetwork.create([genome], config).decider(), schedule)
+    bird = Bird(engine.BIRD_X, engine.BIRD_START_Y)
+
+    win = assets.open_window(WIN_WIDTH, WIN_HEIGHT)
     clock = pygame.time.Clock()
+    speed = controls.SpeedControl()
 
     run = True
     while run:
-        clock.tick(30)
+        speed.tick(clock)
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
+                if record and not game.over():
+                    save_recording(recorder.recording, record)
                 pygame.quit()
                 quit()
 
-        pipe_index = 0
-        if len(pipes) > 1 and bird.x > pipes[0].x + pipes[0].PIPE_TOP.get_width():
-            pipe_index = 1
+            speed.handle(event)
 
-        if bird.isAlive:
-            bird.move()
+        if game.over():
+            game_over_screen(win, game.score)
+            pygame.display.update()
+            continue
 
-            output = neural_network.activate(
-                (bird.y, abs(bird.y - pipes[pipe_index].height), abs(bird.y - pipes[pipe_index].bottom_pipe_pos)))
+        for _ in range(speed.steps()):
+            recorder.step(decide)
+            if game.over():
+                if record:
+                    save_recording(recorder.recording, record)
+                break
 
-            if output[0] > 0.5:
-                bird.jump()
+        draw_game(win, bird, game)
+        pygame.display.update()
 
-            rem = []
-            add_pipe = False
 
-            for pipe in pipes:
-                if pipe.collide(bird):
-                    bird.isAlive = False
+def record_headless(genome, config, course=None, path='replay.fbr', max_frames=None, schedule=None):
+    # Plays the game without a window as fast as it runs, until the bird dies or max_frames, and saves the replay
+    if not isinstance(course, engine.Course):
+        course = engine.Course(course)
 
-                if not pipe.passed and pipe.x < bird.x:
-                    pipe.passed = True
-                    add_pipe = True
+    game = engine.Game(1, course=course, policy=engine.TerminationPolicy(max_score=None))
+    recorder = replay.Recorder(game)
+    decide = engine.DecisionScheduler.wrap(game, network.BatchNetwork.create([genome], config).decider(), schedule)
 
-                if pipe.x + pipe.PIPE_TOP.get_width() < 0:
-                    rem.append(pipe)
+    while not game.over() and (max_frames is None or game.frame < max_frames):
+        recorder.step(decide)
 
-                pipe.move()
+    save_recording(recorder.recording, path)
+    if schedule is not None:
+        print(f'The network was asked for {decide.queries} of {decide.decisions} decisions')
 
-            if add_pipe:
-                score += 1
-                pipes.append(Pipe(600))
 
-            for r in rem:
-                pipes.remove(r)
+def save_recording(recording, path):
+    recording.save(path)
+    print(f'Saved {len(recording)} frames, score {recording.score}, course seed {recording.seed} to {path}')
 
-            if bird.y + bird.img.get_height() >= 680 or bird.y < 0:
-                bird.isAlive = False
 
-            ground.move()
-            draw_window(win, bird, pipes, ground, score)
+def watch_replay(recording, start=0):
+    player = replay.Player(recording, Ground)
+    player.seek(start)
+    bird = Bird(engine.BIRD_X, engine.BIRD_START_Y)
+
+    win = assets.open_window(WIN_WIDTH, WIN_HEIGHT, 'Flappy Bird replay')
+    clock = pygame.time.Clock()
+    speed = controls.SpeedControl()
+    paused = False
+
+    while True:
+        speed.tick(clock)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                quit()
 
+            speed.handle(event)
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_LEFT:
+                    player.seek(player.game.frame - SEEK_FRAMES)
+                elif event.key == pygame.K_RIGHT:
+                    player.seek(player.game.frame + SEEK_FRAMES)
+
+        if not paused:
+            for _ in range(speed.steps()):
+                if not player.step():
+                    break
+
+        if player.game.frame >= len(player) and player.game.over():
+            game_over_screen(win, player.game.score)
         else:
-            game_over_screen(win, score)
+            draw_game(win, bird, player.game)
+        pygame.display.update()
+
+
+def export_frames(recording, directory, start=0, end=None, every=1):
+    # Renders frames start, start + every, ... up to end of a replay into numbered PNGs, no window needed
+    os.makedirs(directory, exist_ok=True)
+    player = replay.Player(recording, Ground)
+    bird = Bird(engine.BIRD_X, engine.BIRD_START_Y)
+    surface = pygame.Surface((WIN_WIDTH, WIN_HEIGHT))
+    end = len(player) if end is None else min(end, len(player))
 
+    count = 0
+    for frame in range(start, end + 1, every):
+        player.seek(frame)
+        draw_game(surface, bird, player.game)
+        pygame.image.save(surface, os.path.join(directory, f'frame-{frame:07d}.png'))
+        count += 1
 
-def run(config_path):
+    print(f'Exported {count} frames to {directory}')
+
+
+def run(config_path, seed=None, record=None, headless=False, max_frames=None, schedule=None):
     config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
                                 neat.DefaultStagnation, config_path)
 
     genome = pickle.load(open('winner.p', 'rb'))
-    main(genome, config)
+    if headless:
+        record_headless(genome, config, seed, record or 'replay.fbr', max_frames, schedule)
+    else:
+        main(genome, config, seed, record, schedule)
 
 
 if __name__ == '__main__':
-    config_path = 'config.txt'
-    run(config_path)
+    parser = argparse.ArgumentParser(description='Watch the saved best bird play')
+    parser.add_argument('--config', default='config.txt')
+    parser.add_argument('--seed', type=engine.seed_arg, help='replay a specific pipe course instead of a random one')
+    parser.add_argument('--record', metavar='FILE', help='save the game as a replay file')
+    parser.add_argument('--headless', action='store_true',
+                        help='record without a window, as fast as possible (to replay.fbr unless --record is given)')
+    parser.add_argument('--max-frames', type=int, help='stop a headless recording after this many frames')
+    parser.add_argument('--replay', metavar='FILE', help='watch a replay file instead of running the network')
+    parser.add_argument('--start', type=int, default=0, help='frame to start the replay or the export at')
+    parser.add_argument('--export', metavar='DIR', help='render the replay frames into PNG files in DIR')
+    parser.add_argument('--end', type=int, help='last frame to export')
+    parser.add_argument('--every', type=engine.interval_arg, default=1, help='export every Nth frame')
+    engine.DecisionScheduler.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.replay:
+        recording = replay.Recording.load(args.replay)
+        if args.export:
+            export_frames(recording, args.export, args.start, args.end, args.every)
+        else:
+            watch_replay(recording, args.start)
+    else:
+        schedule = engine.DecisionScheduler.from_args(args)
+        run(args.config, args.seed, args.record, args.headless, args.max_frames, schedule)
@@ -0,0 +1,163 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import pickle
+import time
+
+import neat
+import numpy as np
+
+import engine
+import network
+
+# Headless comparison of saved genomes. Every genome flies the same seeded courses, a batch of courses per worker
+# process, and the score distribution and simulation throughput of every genome are reported as a table or JSON:
+#
+#   python champions.py winner.p testwinner.p --courses 500
+#   python champions.py winner.p --json > winner.json
+#
+# With --decide-every or --decide-on every genome is played both with its network asked every frame and with the
+# decision schedule, so the table shows what the schedule costs in score next to the share of decisions it saves:
+#
+#   python champions.py winner.p --decide-every 4 --decide-on pipe
+
+# pygame greets on stdout when collision imports it, which would end up in the JSON output
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+COURSES = 200
+SEED = 0
+# Good genomes may never die, so a course ends once its score goes past this
+MAX_SCORE = 200
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+
+def load_config(config_path):
+    return neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                              neat.DefaultStagnation, config_path)
+
+
+def play(genome, config, courses, policy, schedule=None):
+    # Plays one genome on every course in one batched game and returns the scores, frames survived and fitness per
+    # course, with the number of decisions the network was asked for and the time it took
+    start = time.perf_counter()
+    game = engine.Game(len(courses), course=courses, policy=policy)
+    decide_genome = network.BatchNetwork.create([genome], config).decider()
+
+    def decide(inputs, index):
+        return decide_genome(inputs, np.zeros(len(index), dtype=np.int64))
+
+    scheduler = engine.DecisionScheduler.wrap(game, decide, schedule)
+    while not game.over():
+        game.step(scheduler)
+
+    queries = scheduler.queries if schedule is not None else int(game.lifetimes.sum())
+    return game.scores, game.lifetimes, game.fitness, queries, time.perf_counter() - start
+
+
+def summarize(name, scores, lifetimes, fitness, queries, cpu_time, wall_time, max_score, schedule=None):
+    frames = int(lifetimes.sum())
+    return {
+        'genome': name,
+        'schedule': schedule,
+        'courses': len(scores),
+        'score_mean': float(scores.mean()),
+        'score_std': float(scores.std()),
+        'score_min': int(scores.min()),
+        'score_max': int(scores.max()),
+        'score_quantiles': {str(q): float(np.quantile(scores, q)) for q in QUANTILES},
+        'capped': float(np.mean(scores > max_score)) if max_score is not None else 0.0,
+        'fitness_mean': float(fitness.mean()),
+        'frames_mean': float(lifetimes.mean()),
+        'bird_frames': frames,
+        'query_rate': queries / frames if frames else 0.0,
+        'bird_frames_per_s': frames / cpu_time if cpu_time else 0.0,
+        'wall_s': wall_time,
+    }
+
+
+def evaluate(genomes, config, courses, policy, workers, max_score, schedule=None):
+    # genomes is a list of (name, genome), returns one summary per genome, two with a schedule: one with the network
+    # asked every frame and one with the schedule
+    size = max(1, math.ceil(len(courses) / workers))
+    chunks = [courses[i:i + size] for i in range(0, len(courses), size)]
+    schedules = [None] if schedule is None else [None, schedule]
+
+    results = []
+    with multiprocessing.Pool(workers) as pool:
+        for name, genome in genomes:
+            for s in schedules:
+                start = time.perf_counter()
+                jobs = [pool.apply_async(play, (genome, config, chunk, policy, s)) for chunk in chunks]
+                parts = [job.get() for job in jobs]
+                wall_time = time.perf_counter() - start
+
+                scores, lifetimes, fitness, queries, times = zip(*parts)
+                results.append(summarize(name, np.concatenate(scores), np.concatenate(lifetimes),
+                                         np.concatenate(fitness), sum(queries), sum(times), wall_time, max_score, s))
+
+    return results
+
+
+def schedule_label(schedule):
+    if schedule is None:
+        return 'every frame'
+
+    label = [f'every {schedule["every"]}'] + [event for event in ('pipe', 'apex') if schedule[f'on_{event}']]
+    if not schedule['repeat']:
+        label.append('no repeat')
+
+    return ', '.join(label)
+
+
+def print_table(results):
+    columns = ['genome', 'decisions', 'courses', 'mean', 'std', 'min'] + [f'p{round(q * 100)}' for q in QUANTILES] + \
+              ['max', 'capped', 'fitness', 'asked', 'frames/s']
+    rows = []
+    for r in results:
+        rows.append([r['genome'], schedule_label(r['schedule']), str(r['courses']), f'{r["score_mean"]:.1f}',
+                     f'{r["score_std"]:.1f}', str(r['score_min'])] +
+                    [f'{r["score_quantiles"][str(q)]:g}' for q in QUANTILES] +
+                    [str(r['score_max']), f'{r["capped"]:.0%}', f'{r["fitness_mean"]:.1f}', f'{r["query_rate"]:.0%}',
+                     f'{r["bird_frames_per_s"]:.0f}'])
+
+    widths = [max(len(row[i]) for row in rows + [columns]) for i in range(len(columns))]
+    for row in [columns] + rows:
+        print('  '.join(cell.ljust(w) if i < 2 else cell.rjust(w) for i, (cell, w) in enumerate(zip(row, widths))))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare saved genomes on many seeded courses without a window')
+    parser.add_argument('genomes', nargs='+', metavar='GENOME', help='pickled genomes, like winner.p')
+    parser.add_argument('--config', default='config.txt')
+    parser.add_argument('--courses', type=int, default=COURSES, help='number of courses every genome flies')
+    parser.add_argument('--seed', type=int, default=SEED, help='seed the courses are generated from')
+    parser.add_argument('--max-score', type=int, default=MAX_SCORE,
+                        help='end a course once its score goes past this, 0 for never')
+    parser.add_argument('--frame-budget', type=int, help='end a course after this many frames')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--json', action='store_true', help='print JSON instead of a table')
+    engine.DecisionScheduler.add_arguments(parser)
+    args = parser.parse_args()
+
+    max_score = args.max_score or None
+    if max_score is None and args.frame_budget is None:
+        parser.error('--max-score 0 needs a --frame-budget, otherwise a perfect genome never finishes')
+
+    config = load_config(args.config)
+    genomes = []
+    for path in args.genomes:
+        with open(path, 'rb') as f:
+            genomes.append((path, pickle.load(f)))
+
+    courses = engine.Course.fixed_set(args.seed, args.courses)
+    policy = engine.TerminationPolicy(max_score=max_score, frame_budget=args.frame_budget)
+    schedule = engine.DecisionScheduler.from_args(args)
+    results = evaluate(genomes, config, courses, policy, args.workers, max_score, schedule)
+
+    if args.json:
+        print(json.dumps({'seed': args.seed, 'max_score': max_score, 'frame_budget': args.frame_budget,
+                          'results': results}, indent=2))
+    else:
+        print_table(results)
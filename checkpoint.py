@@ -0,0 +1,73 @@
+import glob
+import gzip
+import os
+import pickle
+import random
+import threading
+
+import neat
+
+# Checkpoints in the same format as neat.Checkpointer, so neat.Checkpointer.restore_checkpoint reads them, but written
+# without holding up training. The population is pickled in memory at the end of the generation (it changes as soon
+# as the next one starts), then a background thread compresses it, writes it to a temporary file and renames it into
+# place, so a crash never leaves a half written checkpoint behind. Only the newest `keep` checkpoints are kept
+
+
+class AsyncCheckpointer(neat.Checkpointer):
+    def __init__(self, generation_interval=1, time_interval_seconds=None,
+                 filename_prefix='checkpoints/neat-checkpoint-', keep=5):
+        super().__init__(generation_interval, time_interval_seconds, filename_prefix)
+        self.keep = keep
+        self.writer = None
+
+        directory = os.path.dirname(filename_prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __getstate__(self):
+        # neat pickles the reporters along with the species set, the writer thread can't go with them
+        state = self.__dict__.copy()
+        state['writer'] = None
+        return state
+
+    def save_checkpoint(self, config, population, species_set, generation):
+        filename = f'{self.filename_prefix}{generation}'
+        print(f'Saving checkpoint to {filename}')
+
+        data = pickle.dumps((generation, config, population, species_set, random.getstate()),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+        # Only one write at a time, a new checkpoint waits for the previous one to be on disk
+        self.wait()
+        self.writer = threading.Thread(target=self.write, args=(filename, data), name='checkpoint-writer')
+        self.writer.start()
+
+    def write(self, filename, data):
+        temp = filename + '.tmp'
+        with gzip.open(temp, 'wb', compresslevel=5) as f:
+            f.write(data)
+
+        os.replace(temp, filename)
+        self.rotate()
+
+    def wait(self):
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+    def checkpoints(self):
+        # Finished checkpoints with this prefix, oldest first
+        found = []
+        for filename in glob.glob(glob.escape(self.filename_prefix) + '*'):
+            suffix = filename[len(self.filename_prefix):]
+            if suffix.isdigit():
+                found.append((int(suffix), filename))
+
+        return [filename for _, filename in sorted(found)]
+
+    def rotate(self):
+        if not self.keep:
+            return
+
+        for filename in self.checkpoints()[:-self.keep]:
+            os.remove(filename)
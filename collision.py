@@ -0,0 +1,90 @@
+import functools
+
+import numpy as np
+
+import assets
+import engine
+
+# Pixel exact bird/pipe collision without building pygame masks every frame.
+# The sprite masks are turned into lookup tables once: for the pipe the first and last solid row of every column
+# (pipe columns have no holes), for the bird a running count of solid pixels down every column. Whether a bird
+# overlaps a pipe is then a couple of array lookups per column, for the whole population at once, and gives the same
+# answer as pygame.mask.Mask.overlap
+
+
+def mask_to_array(mask):
+    width, height = mask.get_size()
+    return np.array([[mask.get_at((x, y)) for x in range(width)] for y in range(height)], dtype=bool)
+
+
+class BirdHitbox:
+    def __init__(self, solid):
+        self.height, self.width = solid.shape
+        # counts[c, r] is the number of solid pixels in column c above row r
+        self.counts = np.zeros((self.width, self.height + 1), dtype=np.int32)
+        self.counts[:, 1:] = np.cumsum(solid, axis=0, dtype=np.int32).T
+
+
+class PipeHitbox:
+    def __init__(self, solid):
+        self.height, self.width = solid.shape
+        filled = solid.any(axis=0)
+        first = np.argmax(solid, axis=0)
+        last = self.height - 1 - np.argmax(solid[::-1], axis=0)
+
+        if np.any(filled & (solid.sum(axis=0) != last - first + 1)):
+            raise ValueError('pipe hitbox columns must not have holes')
+
+        # Empty columns get an empty row range so they never count as a hit
+        self.first = np.where(filled, first, self.height)
+        self.last = np.where(filled, last, -1)
+
+
+@functools.lru_cache(maxsize=None)
+def bird_hitbox(frame=0):
+    return BirdHitbox(mask_to_array(assets.BIRD_MASKS[frame]))
+
+
+@functools.lru_cache(maxsize=None)
+def pipe_hitboxes():
+    return PipeHitbox(mask_to_array(assets.PIPE_TOP_MASK)), PipeHitbox(mask_to_array(assets.PIPE_BOTTOM_MASK))
+
+
+def overlap(bird, pipe, dx, dy):
+    # Which birds overlap a pipe placed at (dx, dy[i]) relative to the top left corner of bird i
+    hits = np.zeros(len(dy), dtype=bool)
+
+    c0 = max(0, dx)
+    c1 = min(bird.width, dx + pipe.width)
+    if c0 >= c1:
+        return hits
+
+    # Bounding box pre-test, only birds whose box touches the pipe's box get the per-column test
+    near = np.flatnonzero((dy < bird.height) & (dy + pipe.height > 0))
+    if not len(near):
+        return hits
+
+    cols = np.arange(c0, c1)
+    offset = dy[near, None]
+    lo = np.clip(offset + pipe.first[cols - dx], 0, bird.height)
+    hi = np.clip(offset + pipe.last[cols - dx] + 1, 0, bird.height)
+    solid = bird.counts[cols, hi] - bird.counts[cols, lo]
+
+    hits[near] = (solid > 0).any(axis=1)
+    return hits
+
+
+def collide_at(pipe_x, height, ys, x=engine.BIRD_X, frame=0):
+    # Vectorized Pipe.collide for birds at x and heights ys against the pipe at pipe_x with its gap at height,
+    # height can be one number or one per bird
+    bird = bird_hitbox(frame)
+    top, bottom = pipe_hitboxes()
+    y = np.rint(ys).astype(np.int64)
+    dx = int(pipe_x) - x
+
+    return overlap(bird, top, dx, height - engine.PIPE_HEIGHT - y) | \
+        overlap(bird, bottom, dx, height + engine.Pipe.GAP - y)
+
+
+def collide(pipe, ys, x=engine.BIRD_X, frame=0):
+    return collide_at(pipe.x, pipe.height, ys, x, frame)
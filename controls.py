@@ -0,0 +1,35 @@
+import pygame
+
+FPS = 30
+
+# Keys 1-4 switch between 1x, 4x, 16x and unlimited speed. None means unlimited
+SPEED_KEYS = {
+    pygame.K_1: 1,
+    pygame.K_2: 4,
+    pygame.K_3: 16,
+    pygame.K_4: None,
+}
+
+
+class SpeedControl:
+    # Decides how many simulation frames run between two rendered frames. At a speed of N the window still draws at
+    # FPS but the game advances N frames per draw. Unlimited speed drops the frame cap and draws once every
+    # frames_per_render frames. The simulation itself doesn't look at the clock, so results don't depend on the speed
+
+    def __init__(self, speed=1, frames_per_render=16):
+        self.speed = speed
+        self.frames_per_render = frames_per_render
+
+    def handle(self, event):
+        if event.type == pygame.KEYDOWN and event.key in SPEED_KEYS:
+            self.speed = SPEED_KEYS[event.key]
+
+    def steps(self):
+        if self.speed is None:
+            return self.frames_per_render
+
+        return self.speed
+
+    def tick(self, clock):
+        if self.speed is not None:
+            clock.tick(FPS)
@@ -0,0 +1,592 @@
+import argparse
+import math
+import random
+
+import numpy as np
+
+import profiling
+
+# Simulation state only, no pygame in here. The sizes are the ones of the scale2x'd sprites in imgs/
+# so the rendering classes in the game scripts can subclass these and stay in sync
+
+BIRD_WIDTH = 68
+BIRD_HEIGHT = 48
+PIPE_WIDTH = 104
+PIPE_HEIGHT = 640
+GROUND_WIDTH = 672
+
+BIRD_X = 200
+BIRD_START_Y = 280
+PIPE_START_X = 600
+GROUND_Y = 680
+
+FRAME_REWARD = 0.1
+PIPE_REWARD = 5
+COLLISION_PENALTY = 1
+
+# A generation ends once the birds get past this many pipes
+MAX_SCORE = 30
+
+# Course seeds are kept as unsigned 64 bit numbers, in replay files for one. Seeds derived from another one by adding
+# to it wrap around with offset_seed()
+MAX_SEED = 2 ** 64 - 1
+
+
+class Bird:
+    WIDTH = BIRD_WIDTH
+    HEIGHT = BIRD_HEIGHT
+    MAX_ROTATION = 25
+    ROT_VEL = 20
+    JUMP_VEL = -10.5
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.tilt = 0
+        self.tick_count = 0
+        self.vel = 0
+        self.height = self.y
+
+    def jump(self):
+        self.vel = self.JUMP_VEL
+        self.tick_count = 0
+        self.height = self.y
+
+    def move(self):
+        self.tick_count += 1
+        d = self.vel * self.tick_count + 1.5 * self.tick_count ** 2
+
+        if d >= 16:
+            d = 16
+
+        if d < 0:
+            d -= 2
+
+        self.y += d
+
+        if d < 0 or self.y < self.height + 50:
+            if self.tilt < self.MAX_ROTATION:
+                self.tilt = self.MAX_ROTATION
+
+        else:
+            if self.tilt > -90:
+                self.tilt -= self.ROT_VEL
+
+
+class Pipe:
+    WIDTH = PIPE_WIDTH
+    GAP = 200
+    VEL = 5
+
+    def __init__(self, x, height=None):
+        self.x = x
+        self.height = 0
+        self.passed = False  # Denotes whether the bird has passed the pipe or not
+        self.top_pipe_pos = 0
+        self.bottom_pipe_pos = 0
+        self.set_height(height)
+
+    def set_height(self, height=None):
+        if height is None:
+            height = random.randrange(50, 450)
+
+        self.height = height
+        self.top_pipe_pos = self.height - PIPE_HEIGHT
+        self.bottom_pipe_pos = self.height + self.GAP
+
+    def move(self):
+        self.x -= self.VEL
+
+
+class Ground:
+    VEL = 5
+    WIDTH = GROUND_WIDTH
+
+    def __init__(self, y):
+        self.y = y
+        self.x1 = 0
+        self.x2 = self.WIDTH
+
+    def move(self):
+        self.x1 -= self.VEL
+        self.x2 -= self.VEL
+
+        # x1 and x2 represent 2 ground images. Once one of them gets off-screen we put that one behind the other one
+        # Works kind of like Recycler View in order to create infinite ground
+
+        if self.x1 + self.WIDTH < 0:
+            self.x1 = self.x2 + self.WIDTH
+
+        if self.x2 + self.WIDTH < 0:
+            self.x2 = self.x1 + self.WIDTH
+
+
+def seed_arg(value):
+    # argparse type of the scripts' course seed options, so a bad seed is refused before anything runs
+    seed = int(value)
+    if not 0 <= seed <= MAX_SEED:
+        raise argparse.ArgumentTypeError(f'course seeds go from 0 to {MAX_SEED}')
+
+    return seed
+
+
+def offset_seed(seed, offset):
+    return (seed + offset) % (MAX_SEED + 1)
+
+
+def interval_arg(value):
+    interval = int(value)
+    if interval < 1:
+        raise argparse.ArgumentTypeError('has to be at least 1')
+
+    return interval
+
+
+class Course:
+    # The pipe heights of a game, generated from a seed. The k-th pipe of every game played on the same course gets
+    # the same height, so a game can be replayed exactly from its course seed. Only the seed is pickled
+
+    def __init__(self, seed=None):
+        if seed is not None and not 0 <= seed <= MAX_SEED:
+            raise ValueError(f'course seed {seed} is not in [0, {MAX_SEED}]')
+
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.heights = []
+
+    def __reduce__(self):
+        return Course, (self.seed,)
+
+    def __repr__(self):
+        return f'Course({self.seed})'
+
+    @classmethod
+    def for_generation(cls, seed, generation):
+        # Every generation of a run flies a different course that only depends on the run seed and the generation
+        return cls(offset_seed(seed, generation))
+
+    @classmethod
+    def fixed_set(cls, seed, count):
+        # count courses that only depend on seed, for scoring every genome on the same courses in every generation
+        rng = random.Random(seed)
+        return [cls(rng.randrange(2 ** 32)) for _ in range(count)]
+
+    def height(self, k):
+        while len(self.heights) <= k:
+            self.heights.append(self.rng.randrange(50, 450))
+
+        return self.heights[k]
+
+
+class PipeRing:
+    # The pipes of a game in preallocated arrays used as a ring buffer. Pipes enter on the right and leave on the left
+    # in the order they were spawned, so spawning writes behind the newest pipe and removal drops the oldest one.
+    # Iterating gives the slots of the pipes on screen, oldest first. height has a column per course of the game.
+    # ahead() finds the pipe the birds are flying at in O(1): it only ever moves forward as the pipes go by
+
+    CAPACITY = 4
+
+    def __init__(self, lanes=1, capacity=CAPACITY):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.int64)
+        self.height = np.zeros((capacity, lanes), dtype=np.int64)
+        self.passed = np.zeros(capacity, dtype=bool)
+        self.clear()
+
+    def clear(self):
+        self.head = 0  # slot of the oldest pipe
+        self.count = 0
+        self.next = 0  # position of the pipe ahead of the birds, counted from the oldest pipe
+        self.spawned = 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.slot(i)
+
+    def slot(self, i):
+        return (self.head + i) % self.capacity
+
+    def spawn(self, height, x=PIPE_START_X):
+        if self.count == self.capacity:
+            raise IndexError('pipe ring is full')
+
+        s = self.slot(self.count)
+        self.x[s] = x
+        self.height[s] = height
+        self.passed[s] = False
+        self.count += 1
+        self.spawned += 1
+        return s
+
+    def pop(self):
+        self.head = (self.head + 1) % self.capacity
+        self.count -= 1
+        self.next = max(self.next - 1, 0)
+
+    def ahead(self, bird_x):
+        # Slot of the first pipe the birds haven't flown past yet, or of the newest one if they passed them all
+        while self.next < self.count - 1 and bird_x > self.x[self.slot(self.next)] + Pipe.WIDTH:
+            self.next += 1
+
+        return self.slot(self.next)
+
+    def move(self):
+        # Pipes that were already off screen before moving are dropped, which leaves them on screen for one frame
+        # longer than needed, as the game always did
+        self.x -= Pipe.VEL
+        while self.count and self.x[self.head] + Pipe.WIDTH + Pipe.VEL < 0:
+            self.pop()
+
+
+# The per-bird arrays of a BirdBatch and of a Game with their types. Callers that want them somewhere specific, in
+# shared memory for example, pass them in as state and the game works in them instead of allocating its own
+BIRD_STATE = {
+    'y': np.float64,
+    'vel': np.float64,
+    'tick_count': np.int64,
+    'height': np.float64,
+    'tilt': np.float64,
+    'alive': bool,
+}
+
+SCORE_STATE = {
+    'fitness': np.float64,
+    'scores': np.int64,
+    'lifetimes': np.int64,
+    'retired': bool,
+}
+
+GAME_STATE = dict(BIRD_STATE, **SCORE_STATE)
+
+
+def allocate(fields, size, state=None):
+    # Zeroed arrays for fields, the ones found in state are used and cleared instead of allocated
+    arrays = {}
+    for name, dtype in fields.items():
+        if state is not None and name in state:
+            array = state[name]
+            if array.shape != (size,) or array.dtype != dtype:
+                raise ValueError(f'state array {name} must have shape ({size},) and type {np.dtype(dtype)}')
+            array[:] = 0
+        else:
+            array = np.zeros(size, dtype=dtype)
+
+        arrays[name] = array
+
+    return arrays
+
+
+class BirdBatch:
+    # The state of a whole population of birds, one array entry per bird. Dead birds are only masked out, never removed
+    # so an index keeps pointing at the same genome for the whole generation. The arrays are only ever updated in place
+
+    def __init__(self, size, x=BIRD_X, y=BIRD_START_Y, state=None):
+        arrays = allocate(BIRD_STATE, size, state)
+        self.x = x
+        self.y = arrays['y']
+        self.vel = arrays['vel']
+        self.tick_count = arrays['tick_count']
+        self.height = arrays['height']
+        self.tilt = arrays['tilt']
+        self.alive = arrays['alive']
+
+        self.y[:] = y
+        self.height[:] = y
+        self.alive[:] = True
+
+    def __len__(self):
+        return len(self.y)
+
+    def jump(self, index):
+        self.vel[index] = Bird.JUMP_VEL
+        self.tick_count[index] = 0
+        self.height[index] = self.y[index]
+
+    def move(self):
+        # Same rule as Bird.move, applied to every bird at once. Dead birds keep falling but nothing reads them anymore
+        self.tick_count += 1
+        d = self.vel * self.tick_count + 1.5 * self.tick_count ** 2
+        d = np.minimum(d, 16)
+        d = np.where(d < 0, d - 2, d)
+
+        self.y += d
+
+        rising = (d < 0) | (self.y < self.height + 50)
+        self.tilt[:] = np.where(rising, np.maximum(self.tilt, Bird.MAX_ROTATION),
+                             np.where(self.tilt > -90, self.tilt - Bird.ROT_VEL, self.tilt))
+
+    def kill_out_of_bounds(self):
+        out = self.alive & ((self.y + BIRD_HEIGHT >= GROUND_Y) | (self.y < 0))
+        self.alive[out] = False
+        return out
+
+
+class TerminationPolicy:
+    # Decides when birds or the whole game can stop before every bird is dead, so no frames are spent on results that
+    # are already settled. Stopped birds keep the fitness they have, they are just not simulated any further.
+    #   max_score:     the game ends once the score goes past it, None plays on forever
+    #   frame_budget:  no bird is simulated for more than this many frames
+    #   fitness_cap:   a bird stops as soon as its fitness can't drop below the cap anymore
+    #   stop_at:       the game ends as soon as any bird is certain to reach this fitness
+    # There is no rule for a stalled game: pipes come towards the birds on their own, so every bird that stays alive
+    # passes one about every 80 frames whatever it does
+
+    def __init__(self, max_score=MAX_SCORE, frame_budget=None, fitness_cap=None, stop_at=None):
+        self.max_score = max_score
+        self.frame_budget = frame_budget
+        self.fitness_cap = fitness_cap
+        self.stop_at = stop_at
+
+    @staticmethod
+    def guaranteed(game):
+        # The only way fitness goes down is the collision penalty, which an alive bird can get once at most
+        return np.where(game.birds.alive, game.fitness - COLLISION_PENALTY, game.fitness)
+
+    def retire(self, game):
+        # Alive birds that can stop now
+        if self.fitness_cap is None:
+            return np.zeros(len(game.birds), dtype=bool)
+
+        return game.birds.alive & (self.guaranteed(game) >= self.fitness_cap)
+
+    def over(self, game):
+        if self.max_score is not None and game.score > self.max_score:
+            return True
+
+        if self.frame_budget is not None and game.frame >= self.frame_budget:
+            return True
+
+        if self.stop_at is not None and self.guaranteed(game).max(initial=-np.inf) >= self.stop_at:
+            return True
+
+        return False
+
+
+class Game:
+    # One generation of the training game: a population of birds flying through a shared pipe course.
+    # collide(x, height, ys) returns a bool array telling which of the birds at heights ys hit the pipe at x with gap
+    # height, which is a number or an array with one height per bird. The pipes are a PipeRing.
+    # course is a Course or a course seed, without one the game gets a fresh random course.
+    # course can also be a list of courses, then bird i flies courses[lanes[i]] (by default i % len(courses)) and all
+    # courses are simulated in one batch. Pipes then hold one height per course, so they can't be drawn.
+    # The game is over once every bird is dead or policy, a TerminationPolicy, ends it early.
+    # step() reports its phases and counters to profiler. state optionally holds the GAME_STATE arrays to work in
+
+    def __init__(self, size, collide=None, ground_type=Ground, course=None, policy=None,
+                 profiler=profiling.NULL_PROFILER, lanes=None, state=None):
+        if collide is None:
+            # collision reads the sprite masks through pygame, so it is only imported once a game needs it
+            import collision
+            collide = collision.collide_at
+
+        self.birds = BirdBatch(size, state=state)
+        if isinstance(course, (list, tuple)):
+            self.courses = [c if isinstance(c, Course) else Course(c) for c in course]
+            self.lanes = np.arange(size) % len(self.courses) if lanes is None else np.asarray(lanes)
+        else:
+            self.courses = [course if isinstance(course, Course) else Course(course)]
+            self.lanes = None
+
+        self.course = self.courses[0]
+        self.pipes = PipeRing(len(self.courses))
+        self.spawn_pipe()
+        self.ground = ground_type(GROUND_Y)
+        self.collide = collide
+        self.policy = TerminationPolicy() if policy is None else policy
+        self.profiler = profiler
+        arrays = allocate(SCORE_STATE, size, state)
+        self.fitness = arrays['fitness']
+        # Pipes passed and frames survived by every bird
+        self.scores = arrays['scores']
+        self.lifetimes = arrays['lifetimes']
+        self.retired = arrays['retired']
+        self.score = 0
+        self.frame = 0
+
+    def spawn_pipe(self):
+        k = self.pipes.spawned
+        self.pipes.spawn([course.height(k) for course in self.courses])
+
+    def next_pipe(self):
+        return self.pipes.ahead(self.birds.x)
+
+    def pipe_height(self, s, index):
+        # The gap height of the pipe in slot s as the birds at index see it, one per bird with several courses
+        if self.lanes is None:
+            return self.pipes.height[s, 0]
+
+        return self.pipes.height[s, self.lanes[index]]
+
+    def observe(self, index, s):
+        y = self.birds.y[index]
+        height = self.pipe_height(s, index)
+        return np.column_stack((y, np.abs(y - height), np.abs(y - (height + Pipe.GAP))))
+
+    def step(self, decide):
+        # decide(inputs, index) gets the network inputs of the alive birds at index and returns which of them jump.
+        # Returns False once every bird is dead
+        if not self.birds.alive.any():
+            return False
+
+        index, inputs = self.advance()
+        jumps = np.asarray(decide(inputs, index), dtype=bool)
+        self.profiler.lap('activate')
+        self.resolve(index, jumps)
+        return True
+
+    def advance(self):
+        # First half of a frame, up to where the birds decide: moves them and returns the index of the alive birds
+        # with their network inputs. resolve() finishes the frame
+        birds = self.birds
+        profiler = self.profiler
+        index = np.flatnonzero(birds.alive)
+
+        profiler.count('frames')
+        profiler.count('bird_frames', len(index))
+
+        next_pipe = self.next_pipe()
+
+        birds.move()
+        self.fitness[index] += FRAME_REWARD
+        self.lifetimes[index] += 1
+        profiler.lap('move')
+
+        return index, self.observe(index, next_pipe)
+
+    def resolve(self, index, jumps):
+        # Second half of a frame: the birds at index[jumps] jump, then collisions, scoring and pipe spawning
+        birds = self.birds
+        profiler = self.profiler
+        pipes = self.pipes
+        birds.jump(index[jumps])
+
+        add_pipe = False
+
+        for s in pipes:
+            index = np.flatnonzero(birds.alive)
+            if len(index):
+                profiler.lap('bookkeeping')
+                hit = index[self.collide(pipes.x[s], self.pipe_height(s, index), birds.y[index])]
+                profiler.lap('collide')
+                profiler.count('collision_tests', len(index))
+                profiler.count('collisions', len(hit))
+
+                self.fitness[hit] -= COLLISION_PENALTY
+                birds.alive[hit] = False
+
+                if not pipes.passed[s] and pipes.x[s] < birds.x:
+                    pipes.passed[s] = True
+                    add_pipe = True
+
+        pipes.move()
+
+        if add_pipe:
+            self.score += 1
+            self.fitness[birds.alive] += PIPE_REWARD
+            self.scores[birds.alive] += 1
+            self.spawn_pipe()
+
+        birds.kill_out_of_bounds()
+
+        retire = self.policy.retire(self)
+        birds.alive[retire] = False
+        self.retired |= retire
+
+        self.ground.move()
+        self.frame += 1
+        profiler.lap('bookkeeping')
+
+    def over(self):
+        return not self.birds.alive.any() or self.policy.over(self)
+
+
+class DecisionScheduler:
+    # Wraps a decide function for Game.step so the networks aren't asked every frame. A bird is asked again `every`
+    # frames after its last decision, or earlier on an event: on_pipe asks every bird right after a pipe is passed,
+    # on_apex asks a bird at the top of its jump. In between a bird repeats its last decision, so a jump is held for
+    # the whole interval, or with repeat=False it doesn't jump until it is asked again.
+    # every=1 without events asks every bird every frame, exactly like decide on its own.
+    # queries and decisions count the decisions taken by the networks and all decisions taken, also reported to the
+    # game's profiler as network_queries
+
+    # The first frame a bird that jumped stops going up, Bird.move's displacement turns positive then
+    APEX_TICK = math.ceil(-Bird.JUMP_VEL / 1.5)
+
+    def __init__(self, game, decide, every=1, on_pipe=False, on_apex=False, repeat=True):
+        if every < 1:
+            raise ValueError('every has to be at least 1')
+
+        size = len(game.birds)
+        self.game = game
+        self.decide = decide
+        self.every = every
+        self.on_pipe = on_pipe
+        self.on_apex = on_apex
+        self.repeat = repeat
+        self.last = np.zeros(size, dtype=bool)
+        # The frame every bird is asked at next
+        self.due = np.zeros(size, dtype=np.int64)
+        self.score = game.score
+        self.queries = 0
+        self.decisions = 0
+
+    def __call__(self, inputs, index):
+        game = self.game
+        ask = self.due[index] <= game.frame
+        if self.on_pipe and game.score != self.score:
+            self.score = game.score
+            ask[:] = True
+        if self.on_apex:
+            birds = game.birds
+            ask |= (birds.tick_count[index] == self.APEX_TICK) & (birds.vel[index] == Bird.JUMP_VEL)
+
+        asked = index[ask]
+        if len(asked):
+            self.last[asked] = self.decide(inputs[ask], asked)
+            self.due[asked] = game.frame + self.every
+
+        self.queries += len(asked)
+        self.decisions += len(index)
+        game.profiler.count('network_queries', len(asked))
+
+        if self.repeat:
+            return self.last[index]
+
+        return ask & self.last[index]
+
+    def query_rate(self):
+        return self.queries / self.decisions if self.decisions else 0.0
+
+    @staticmethod
+    def add_arguments(parser):
+        # The options of every script that runs networks, read back with from_args()
+        parser.add_argument('--decide-every', type=interval_arg, default=1, metavar='K',
+                            help='ask the networks every K frames and repeat their last decision in between')
+        parser.add_argument('--decide-on', nargs='+', default=[], choices=['pipe', 'apex'],
+                            help='also ask the networks right after a pipe is passed or at the top of a jump')
+        parser.add_argument('--no-repeat', action='store_true',
+                            help="don't jump between decisions instead of repeating the last one")
+
+    @classmethod
+    def from_args(cls, args):
+        return cls.schedule(args.decide_every, args.decide_on, not args.no_repeat)
+
+    @staticmethod
+    def schedule(every=1, events=(), repeat=True):
+        # The scheduler arguments for the options of add_arguments(), None when the networks are asked every frame
+        # anyway
+        if every == 1 and not events:
+            return None
+
+        return {'every': every, 'on_pipe': 'pipe' in events, 'on_apex': 'apex' in events, 'repeat': repeat}
+
+    @classmethod
+    def wrap(cls, game, decide, schedule):
+        # schedule is None or the keyword arguments of a scheduler, the form the scripts pass it around in
+        if schedule is None:
+            return decide
+
+        return cls(game, decide, **schedule)
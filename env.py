@@ -0,0 +1,91 @@
+import numpy as np
+
+import engine
+
+# Gymnasium-style environments over the training game, for trainers other than NEAT. The dynamics, observations and
+# rewards are exactly those of training: an observation is the network input (y, distance to the gap top, distance to
+# the gap bottom), an action is whether to jump, and the rewards of an episode add up to the bird's fitness.
+# step() returns (observation, reward, terminated, truncated, info) like gymnasium does, without depending on it.
+#
+#   env = VectorFlappyEnv(1000)
+#   obs, info = env.reset(seed=42)
+#   while not env.done():
+#       obs, reward, terminated, truncated, info = env.step(obs[:, 2] < obs[:, 1])
+
+
+class VectorFlappyEnv:
+    # num_envs birds stepped together as one batched game. Birds fly the same pipe timeline, so there is no autoreset:
+    # a bird that died stays terminated until every env is done and reset() starts the next batch of episodes.
+    # With num_courses > 1 env i flies course i % num_courses, all generated from the reset seed.
+    # policy is the engine.TerminationPolicy of every episode, by default the one used in training.
+    # terminated marks birds that died, truncated the ones the policy stopped while still flying
+
+    OBSERVATION_SIZE = 3
+
+    def __init__(self, num_envs, num_courses=1, policy=None):
+        self.num_envs = num_envs
+        self.num_courses = num_courses
+        self.policy = policy
+        self.game = None
+
+    def reset(self, seed=None):
+        if self.num_courses > 1:
+            course = engine.Course.fixed_set(seed, self.num_courses)
+        else:
+            course = engine.Course(seed)
+
+        policy = engine.TerminationPolicy() if self.policy is None else self.policy
+        self.game = engine.Game(self.num_envs, course=course, policy=policy)
+        self.observation = np.zeros((self.num_envs, self.OBSERVATION_SIZE))
+        self.last_fitness = np.zeros(self.num_envs)
+        self.advance()
+        return self.observation.copy(), self.info()
+
+    def advance(self):
+        if self.game.over():
+            self.index = None
+            return
+
+        self.index, inputs = self.game.advance()
+        self.observation[self.index] = inputs
+
+    def done(self):
+        return self.index is None
+
+    def step(self, actions):
+        if self.game is None:
+            raise RuntimeError('reset() has to be called before step()')
+        if self.done():
+            raise RuntimeError('every env is done, call reset()')
+
+        actions = np.broadcast_to(np.asarray(actions, dtype=bool), (self.num_envs,))
+        self.game.resolve(self.index, actions[self.index])
+        self.advance()
+
+        game = self.game
+        reward = game.fitness - self.last_fitness
+        self.last_fitness = game.fitness.copy()
+
+        truncated = game.retired | (game.birds.alive & self.done())
+        terminated = ~game.birds.alive & ~game.retired
+        return self.observation.copy(), reward, terminated, truncated, self.info()
+
+    def info(self):
+        game = self.game
+        return {'frame': game.frame, 'score': game.score, 'scores': game.scores.copy(),
+                'course_seeds': [course.seed for course in game.courses]}
+
+
+class FlappyEnv:
+    # A single bird, with plain numbers instead of arrays
+
+    def __init__(self, policy=None):
+        self.env = VectorFlappyEnv(1, policy=policy)
+
+    def reset(self, seed=None):
+        observation, info = self.env.reset(seed)
+        return observation[0], info
+
+    def step(self, action):
+        observation, reward, terminated, truncated, info = self.env.step([action])
+        return observation[0], float(reward[0]), bool(terminated[0]), bool(truncated[0]), info
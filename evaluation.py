@@ -0,0 +1,304 @@
+import collections
+import hashlib
+import math
+import multiprocessing
+import random
+import sys
+from multiprocessing import resource_tracker
+
+import numpy as np
+from neat.reporting import BaseReporter
+
+import engine
+import network
+import profiling
+from shared import SharedArrays
+
+
+# How the fitness of a genome on several courses is combined into one, besides a quantile given as a number
+AGGREGATES = {
+    'mean': np.mean,
+    'min': np.min,
+    'median': np.median,
+}
+
+
+def aggregate(fitness, how='mean'):
+    # fitness has one row per genome and one column per course
+    if how in AGGREGATES:
+        return AGGREGATES[how](fitness, axis=1)
+
+    return np.quantile(fitness, float(how), axis=1)
+
+
+def play(genomes, config, course, policy=None, how='mean', profiler=profiling.NULL_PROFILER, schedule=None):
+    # Plays one headless game with the given genomes and returns their fitness in the same order.
+    # The same genomes on the same course always get the same fitness.
+    # With a list of courses every genome flies all of them in the same batched game, as birds
+    # i * len(course) ... (i + 1) * len(course) - 1, and gets the fitness aggregated over the courses.
+    # schedule optionally holds the arguments of an engine.DecisionScheduler deciding when the networks are asked
+    if not isinstance(course, list):
+        game = engine.Game(len(genomes), course=course, policy=policy, profiler=profiler)
+        decide = engine.DecisionScheduler.wrap(game, network.BatchNetwork.create(genomes, config).decider(), schedule)
+
+        profiler.start()
+        while not game.over():
+            game.step(decide)
+
+        return game.fitness.tolist()
+
+    n = len(course)
+    game = engine.Game(len(genomes) * n, course=course, policy=policy, profiler=profiler)
+    decide_genome = network.BatchNetwork.create(genomes, config).decider()
+
+    def decide(inputs, index):
+        return decide_genome(inputs, index // n)
+
+    decide = engine.DecisionScheduler.wrap(game, decide, schedule)
+    profiler.start()
+    while not game.over():
+        game.step(decide)
+
+    return aggregate(game.fitness.reshape(len(genomes), n), how).tolist()
+
+
+def course_key(course, how='mean'):
+    # Everything besides the genome that decides its fitness, as used by FitnessCache
+    if isinstance(course, list):
+        return tuple(c.seed for c in course), how
+
+    return course.seed
+
+
+def course_seed(course):
+    # The seed kept with a genome's fitness so its game can be replayed, the first course of a list
+    return course[0].seed if isinstance(course, list) else course.seed
+
+
+class FitnessCache(BaseReporter):
+    # Remembers the fitness of genomes that were already played on a course, so elites carried over unchanged into
+    # the next generation aren't played again. The key is a hash of everything that decides how a genome plays: its
+    # enabled connections and weights, its nodes, and the course (see course_key). Only useful when generations share
+    # a course.
+    # The least recently used entries are dropped once the cache holds more than max_bytes.
+    # The fitness of a bird doesn't depend on the other birds in its game, except when a TerminationPolicy with
+    # stop_at ends the game for everyone, so don't combine the cache with that
+
+    ENTRY_BYTES = 100  # rough per-entry overhead of the OrderedDict on top of the key and value objects
+
+    def __init__(self, max_bytes=64 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # The cache is rebuilt quickly, keep it out of the checkpoints neat pickles its reporters into
+        state = self.__dict__.copy()
+        state['entries'] = collections.OrderedDict()
+        state['bytes'] = 0
+        return state
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(genome, course):
+        connections = sorted((key, cg.weight) for key, cg in genome.connections.items() if cg.enabled)
+        nodes = sorted((key, ng.bias, ng.response, ng.activation, ng.aggregation) for key, ng in genome.nodes.items())
+        return hashlib.blake2b(repr((course, connections, nodes)).encode(), digest_size=16).digest()
+
+    def get(self, key):
+        fitness = self.entries.get(key)
+        if fitness is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return fitness
+
+    def put(self, key, fitness):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+
+        self.entries[key] = fitness
+        self.bytes += self.ENTRY_BYTES + sys.getsizeof(key) + sys.getsizeof(fitness)
+
+        while self.bytes > self.max_bytes and self.entries:
+            old_key, old_fitness = self.entries.popitem(last=False)
+            self.bytes -= self.ENTRY_BYTES + sys.getsizeof(old_key) + sys.getsizeof(old_fitness)
+
+    def lookup(self, genomes, course):
+        # Gives every cached genome its fitness and returns the ones that still have to be played
+        missing = []
+        for g in genomes:
+            fitness = self.get(self.key(g, course))
+            if fitness is None:
+                missing.append(g)
+            else:
+                g.fitness = fitness
+
+        return missing
+
+    def store(self, genomes, course):
+        for g in genomes:
+            self.put(self.key(g, course), g.fitness)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def post_evaluate(self, config, population, species, best_genome):
+        print(f'Fitness cache: {self.hit_rate():.1%} hit rate, {len(self)} entries, {self.bytes / 2 ** 20:.1f} MB')
+
+
+class ParallelEvaluator:
+    # Drop in replacement for the fitness function passed to neat.Population.run. The population is split into chunks
+    # and every chunk plays its own game on a worker process. All chunks of a generation fly the same seeded course,
+    # and birds in a game don't affect each other, so the fitness is the same as playing everyone in one game.
+    # With fixed_course every generation flies the course of the run seed itself, with courses > 1 every genome flies
+    # that many courses fixed by the seed and gets the fitness aggregated as `how` says. cache is an optional
+    # FitnessCache. schedule is passed on to play(). The counters of the workers' games are added up in profiler, which
+    # can be swapped for a profiling.Profiler
+
+    def __init__(self, num_workers=None, seed=None, chunk_size=None, policy=None, fixed_course=False, cache=None,
+                 courses=1, how='mean', schedule=None):
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.chunk_size = chunk_size
+        self.policy = policy
+        self.fixed_course = fixed_course
+        self.cache = cache
+        self.courses = courses
+        self.how = how
+        self.schedule = schedule
+        self.profiler = profiling.NULL_PROFILER
+        self.generation = 0
+        self.pool = multiprocessing.Pool(self.num_workers)
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def evaluate(self, genomes, config):
+        self.generation += 1
+        if self.courses > 1:
+            course = engine.Course.fixed_set(self.seed, self.courses)
+        elif self.fixed_course:
+            course = engine.Course(self.seed)
+        else:
+            course = engine.Course.for_generation(self.seed, self.generation)
+
+        genomes = [g for _, g in genomes]
+        for g in genomes:
+            g.course_seed = course_seed(course)
+
+        key = course_key(course, self.how)
+        if self.cache is not None:
+            genomes = self.cache.lookup(genomes, key)
+
+        for g, fitness in zip(genomes, self.simulate(genomes, config, course)):
+            g.fitness = fitness
+
+        if self.cache is not None:
+            self.cache.store(genomes, key)
+
+    def slices(self, size):
+        step = self.chunk_size or max(1, math.ceil(size / self.num_workers))
+        return [(lo, min(lo + step, size)) for lo in range(0, size, step)]
+
+    def simulate(self, genomes, config, course):
+        # The fitness of every genome on course
+        jobs = [self.pool.apply_async(play_counted, (genomes[lo:hi], config, course, self.policy, self.how,
+                                                       self.schedule))
+                for lo, hi in self.slices(len(genomes))]
+
+        results = []
+        for job in jobs:
+            fitness, counters = job.get()
+            results += fitness
+            for name, n in counters.items():
+                self.profiler.count(name, n)
+
+        return results
+
+
+def play_counted(genomes, config, course, policy, how, schedule):
+    # play() on a worker, also returning the counters of its game for the parent's profiler
+    profiler = profiling.Profiler()
+    return play(genomes, config, course, policy, how, profiler, schedule), profiler.counters
+
+
+def play_slice(shared, lo, hi, num_inputs, course, policy, schedule=None):
+    # Worker side of SharedMemoryEvaluator. The game has to be gone before the shared block can be closed
+    try:
+        run_slice(shared, lo, hi, num_inputs, course, policy, schedule)
+    finally:
+        shared.close()
+
+
+def run_slice(shared, lo, hi, num_inputs, course, policy, schedule=None):
+    n = len(course) if isinstance(course, list) else 1
+    # Every worker reads the networks of its slice right from the shared block, read-only so nothing can change them
+    arrays = {}
+    for name in network.BatchNetwork.ARRAYS:
+        arrays[name] = shared[name][lo:hi]
+        arrays[name].flags.writeable = False
+    net = network.BatchNetwork.from_arrays(arrays, num_inputs)
+    state = {name: shared[name][lo * n:hi * n] for name in engine.GAME_STATE}
+    game = engine.Game((hi - lo) * n, course=course, policy=policy, state=state)
+    decide_genome = net.decider()
+
+    def decide(inputs, index):
+        return decide_genome(inputs, index // n)
+
+    decide = engine.DecisionScheduler.wrap(game, decide, schedule)
+    while not game.over():
+        game.step(decide)
+
+
+class SharedMemoryEvaluator(ParallelEvaluator):
+    # ParallelEvaluator for big populations: the networks are compiled once in this process, and their arrays and every
+    # per-bird array of the game are put in shared memory. Every worker simulates its own slice of the birds right in
+    # those arrays, so only the block name and the slice bounds go to the workers and nothing but an ack comes back
+
+    def __init__(self, *args, **kwargs):
+        # The workers have to share this process' resource tracker, see shared.py
+        resource_tracker.ensure_running()
+        super().__init__(*args, **kwargs)
+
+    def simulate(self, genomes, config, course):
+        n = len(course) if isinstance(course, list) else 1
+        net = network.BatchNetwork.create(genomes, config)
+        arrays = net.arrays()
+
+        layout = {name: (array.shape, array.dtype) for name, array in arrays.items()}
+        layout.update((name, ((len(genomes) * n,), dtype)) for name, dtype in engine.GAME_STATE.items())
+        shared = SharedArrays(layout)
+        try:
+            for name, array in arrays.items():
+                shared[name][...] = array
+
+            jobs = [self.pool.apply_async(play_slice, (shared, lo, hi, net.num_inputs, course, self.policy,
+                                                             self.schedule))
+                    for lo, hi in self.slices(len(genomes))]
+            for job in jobs:
+                job.get()
+
+            self.profiler.count('bird_frames', int(shared['lifetimes'].sum()))
+            fitness = shared['fitness'].reshape(len(genomes), n)
+            if n > 1:
+                return aggregate(fitness, self.how).tolist()
+
+            return fitness[:, 0].tolist()
+        finally:
+            fitness = None
+            shared.close()
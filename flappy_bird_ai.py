@@ -1,302 +1,379 @@
+import argparse
+import itertools
 import pygame
-import random
+import assets
+import checkpoint
+import controls
+import engine
+from sprites import Bird, Pipe, Ground, draw_pipes
+import evaluation
+import islands
+import metrics
+import network
+import viewer
 import neat
+import profiling
 import pickle
+import random
 
 WIN_WIDTH = 500
 WIN_HEIGHT = 750
 
-BIRD_IMGS = [pygame.transform.scale2x(pygame.image.load('imgs/bird1.png')),
-             pygame.transform.scale2x(pygame.image.load('imgs/bird2.png')),
-             pygame.transform.scale2x(pygame.image.load('imgs/bird3.png'))]
-
-PIPE_IMG = pygame.transform.scale2x(pygame.image.load('imgs/pipe.png'))
-GROUND_IMG = pygame.transform.scale2x(pygame.image.load('imgs/base.png'))
-BG_IMG = pygame.transform.scale2x(pygame.image.load('imgs/bg.png'))
 GEN = 0
 
-pygame.init()
-font = pygame.font.Font('Pixeltype.ttf', 50)
-
-
-class Bird:
-    IMGS = BIRD_IMGS
-    MAX_ROTATION = 25
-    ROT_VEL = 20
-    ANIMATION_RATE = 0.7
-
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.tilt = 0
-        self.tick_count = 0
-        self.vel = 0
-        self.height = self.y
-        self.img_index = 0
-        self.reverse_animate = False
-        self.img = self.IMGS[0]
-
-    def jump(self):
-        self.vel = -10.5
-        self.tick_count = 0
-        self.height = self.y
-
-    def move(self):
-        self.tick_count += 1
-        d = self.vel * self.tick_count + 1.5 * self.tick_count ** 2
-
-        if d >= 16:
-            d = 16
-
-        if d < 0:
-            d -= 2
-
-        self.y += d
-
-        if d < 0 or self.y < self.height + 50:
-            if self.tilt < self.MAX_ROTATION:
-                self.tilt = self.MAX_ROTATION
-
-        else:
-            if self.tilt > -90:
-                self.tilt -= self.ROT_VEL
+# Headless training skips the window, the frame cap and all drawing. WATCH_EVERY > 0 still shows every Nth generation
+HEADLESS = False
+WATCH_EVERY = 0
+
+# Every generation flies a course derived from SEED, so a run can be replayed. run() picks a seed if none is given.
+# With FIXED_COURSE every generation flies the course of SEED itself instead of one derived from it.
+# With COURSES > 1 every genome flies that many courses fixed by SEED in one batched game and its fitness is combined
+# over them as AGGREGATE says (see evaluation.AGGREGATES), those generations are never watched.
+# WORKERS > 0 evaluates the population on a process pool, with SHARED_MEMORY the workers simulate their birds in
+# shared memory instead of receiving pickled genomes
+SEED = None
+FIXED_COURSE = False
+COURSES = 1
+AGGREGATE = 'mean'
+WORKERS = 0
+SHARED_MEMORY = False
+
+# ISLANDS > 1 trains that many separate populations in their own processes instead, exchanging MIGRANTS of their best
+# genomes every MIGRATE_EVERY generations through TRANSPORT, see islands.py
+ISLANDS = 1
+MIGRATE_EVERY = islands.MIGRATE_EVERY
+MIGRANTS = islands.MIGRANTS
+TRANSPORT = 'queue'
+
+# An evaluation.FitnessCache, so genomes already played on a course aren't played again
+CACHE = None
+
+# Shared between generations so a speed picked with the 1-4 keys sticks while watching. Watched generations start at
+# unlimited speed, so opening the window doesn't slow training down. Keys 1-3 pace the simulation to be followed by eye
+SPEED = controls.SpeedControl(speed=None)
+
+# The population is checkpointed every CHECKPOINT_EVERY generations, keeping the newest CHECKPOINT_KEEP.
+# RESUME names a checkpoint to continue from instead of starting a new population
+GENERATIONS = 10
+CHECKPOINT_EVERY = 1
+CHECKPOINT_KEEP = 5
+CHECKPOINT_PREFIX = 'checkpoints/neat-checkpoint-'
+RESUME = None
+STOP_AT_THRESHOLD = False
+
+# When a generation may stop before every bird is dead, see engine.TerminationPolicy. The default only stops once the
+# birds get past engine.MAX_SCORE pipes
+POLICY = engine.TerminationPolicy()
+
+# Swapped for a profiling.Profiler by --profile or --metrics, the generation loop reports its phase timings to it.
+# PROFILE prints them after every generation
+PROFILER = profiling.NULL_PROFILER
+PROFILE = False
+
+# With METRICS set one row per generation is appended to that file, see metrics.py. Only the last METRICS_HISTORY rows
+# are kept in memory, and the unbounded neat.StatisticsReporter isn't used then
+METRICS = None
+METRICS_HISTORY = metrics.HISTORY
+
+# Arguments of an engine.DecisionScheduler when the networks shouldn't be asked every frame, set by --decide-every and
+# --decide-on. The profile shows how many decisions the networks were asked for
+SCHEDULE = None
+
+
+def draw_window(win, snapshot, sprites):
+    # Draws a viewer.Snapshot of the game
+    font = assets.font()
+    win.blit(assets.BG_IMG, (0, 0))
+
+    pipes = snapshot.pipes
+    draw_pipes(win, pipes)
+
+    score_text = font.render(f'Score: {snapshot.score}', False, (255, 255, 255))
+    gen_text = font.render(f'Gen: {snapshot.gen}', False, (255, 255, 255))
+    num_of_birds_text = font.render(f'Birds: {len(snapshot.index)}', False, (255, 255, 255))
 
-    def draw(self, win):
-        if self.reverse_animate:
-            self.img_index -= self.ANIMATION_RATE
-        else:
-            self.img_index += self.ANIMATION_RATE
-
-        if self.img_index >= 3:
-            self.reverse_animate = True
-            self.img_index = 2
-
-        elif self.img_index <= 0:
-            self.reverse_animate = False
-            self.img_index = 0
-
-        self.img = self.IMGS[int(self.img_index)]
-
-        if self.tilt <= -80:
-            self.img = self.IMGS[2]
-            self.img_index = 2
-
-        rotated_image = pygame.transform.rotate(self.img, self.tilt)
-        new_rect = rotated_image.get_rect(center=self.img.get_rect(topleft=(self.x, self.y)).center)
-        win.blit(rotated_image, new_rect.topleft)
-
-    def get_mask(self):
-        return pygame.mask.from_surface(self.img)
+    win.blit(score_text, (WIN_WIDTH - 10 - score_text.get_width(), 10))
+    win.blit(gen_text, (10, 10))
+    win.blit(num_of_birds_text, (10, 10 + gen_text.get_height()))
 
+    s = pipes.ahead(engine.BIRD_X)
+    pipe_x = pipes.x[s]
+    height = pipes.height[s, 0]
 
-class Pipe:
-    GAP = 200
-    VEL = 5
+    for i, y, tilt in zip(snapshot.index, snapshot.y, snapshot.tilt):
+        # The sprites only keep the animation state, position and tilt come from the simulation
+        bird = sprites[i]
+        bird.y = y
+        bird.tilt = tilt
+        bird.draw(win)
 
-    def __init__(self, x):
-        self.x = x
-        self.height = 0
-        self.passed = False  # Denotes whether the bird has passed the pipe or not
-        self.top_pipe_pos = 0
-        self.bottom_pipe_pos = 0
+        pygame.draw.line(win, (255, 255, 255), (200 + bird.img.get_width(), bird.y), (pipe_x, height), 3)
+        pygame.draw.line(win, (255, 255, 255), (200 + bird.img.get_width(), bird.y), (pipe_x, height + Pipe.GAP), 3)
 
-        self.PIPE_TOP = pygame.transform.flip(PIPE_IMG, False, True)
-        self.PIPE_BOTTOM = PIPE_IMG
-        self.set_height()
+    snapshot.ground.draw(win)
+    pygame.display.update()
 
-    def set_height(self):
-        self.height = random.randrange(50, 450)
-        self.top_pipe_pos = self.height - self.PIPE_TOP.get_height()
-        self.bottom_pipe_pos = self.height + self.GAP
 
-    def move(self):
-        self.x -= self.VEL
+def main(genomes, config):
+    global GEN
+    GEN += 1
+    ge = []
 
-    def draw(self, win):
-        win.blit(self.PIPE_TOP, (self.x, self.top_pipe_pos))
-        win.blit(self.PIPE_BOTTOM, (self.x, self.bottom_pipe_pos))
+    for _, g in genomes:
+        g.fitness = 0
+        ge.append(g)
 
-    def collide(self, bird):
-        bird_mask = bird.get_mask()
-        top_mask = pygame.mask.from_surface(self.PIPE_TOP)
-        bottom_mask = pygame.mask.from_surface(self.PIPE_BOTTOM)
+    if COURSES > 1:
+        course = engine.Course.fixed_set(SEED, COURSES)
+    elif SEED is None:
+        course = engine.Course()
+    elif FIXED_COURSE:
+        course = engine.Course(SEED)
+    else:
+        course = engine.Course.for_generation(SEED, GEN)
 
-        top_offset = (self.x - bird.x, self.top_pipe_pos - round(bird.y))
-        bottom_offset = (self.x - bird.x, self.bottom_pipe_pos - round(bird.y))
+    # The course seed is kept with the fitness so every genome's score can be replayed later
+    for g in ge:
+        g.course_seed = evaluation.course_seed(course)
 
-        # Returns None if there is no collision between bird mask and top mask
-        t_point = bird_mask.overlap(top_mask, top_offset)
-        b_point = bird_mask.overlap(bottom_mask, bottom_offset)
+    key = evaluation.course_key(course, AGGREGATE)
+    if CACHE is not None:
+        ge = CACHE.lookup(ge, key)
 
-        if t_point or b_point:
-            return True
+    if COURSES > 1:
+        for g, fitness in zip(ge, evaluation.play(ge, config, course, POLICY, AGGREGATE, PROFILER, SCHEDULE)):
+            g.fitness = fitness
 
-        return False
+        if CACHE is not None:
+            CACHE.store(ge, key)
+        return
 
+    game = engine.Game(len(ge), ground_type=Ground, course=course, policy=POLICY,
+                       profiler=PROFILER)
+    decide = engine.DecisionScheduler.wrap(game, network.BatchNetwork.create(ge, config).decider(), SCHEDULE)
 
-class Ground:
-    VEL = 5
-    WIDTH = GROUND_IMG.get_width()
-    IMG = GROUND_IMG
+    watch = should_watch(GEN)
+    if watch:
+        # The game runs on a background thread and the window draws the newest snapshot of it, see viewer.py
+        win = assets.open_window(WIN_WIDTH, WIN_HEIGHT)
+        sprites = [Bird(engine.BIRD_X, engine.BIRD_START_Y) for _ in ge]
+        buffer = viewer.LatestBuffer()
 
-    def __init__(self, y):
-        self.y = y
-        self.x1 = 0
-        self.x2 = self.WIDTH
+        def simulate(stop):
+            clock = pygame.time.Clock()
+            PROFILER.start()
+            while not game.over() and not stop.is_set():
+                SPEED.tick(clock)
+                PROFILER.lap('tick')
+                for _ in range(SPEED.steps()):
+                    game.step(decide)
+                    if game.over():
+                        break
 
-    def move(self):
-        self.x1 -= self.VEL
-        self.x2 -= self.VEL
+                buffer.publish(viewer.snapshot(game, GEN))
+                PROFILER.lap('snapshot')
 
-        # x1 and x2 represent 2 ground images. Once one of them gets off-screen we put that one behind the other one
-        # Works kind of like Recycler View in order to create infinite ground
+        viewer.watch(simulate, lambda snapshot: draw_window(win, snapshot, sprites), buffer, SPEED)
 
-        if self.x1 + self.WIDTH < 0:
-            self.x1 = self.x2 + self.WIDTH
+    PROFILER.start()
+    while not game.over():
+        game.step(decide)
 
-        if self.x2 + self.WIDTH < 0:
-            self.x2 = self.x1 + self.WIDTH
+    for g, fitness in zip(ge, game.fitness.tolist()):
+        g.fitness = fitness
 
-    def draw(self, win):
-        win.blit(self.IMG, (self.x1, self.y))
-        win.blit(self.IMG, (self.x2, self.y))
+    if CACHE is not None:
+        CACHE.store(ge, key)
 
+    # Close the window again so it doesn't sit unresponsive through the headless generations that follow
+    if watch and HEADLESS:
+        pygame.display.quit()
 
-def draw_window(win, birds, pipes, ground, score, gen):
-    win.blit(BG_IMG, (0, 0))
 
-    for pipe in pipes:
-        pipe.draw(win)
+def should_watch(gen):
+    if not HEADLESS:
+        return True
 
-    score_text = font.render(f'Score: {score}', False, (255, 255, 255))
-    gen_text = font.render(f'Gen: {gen}', False, (255, 255, 255))
-    num_of_birds_text = font.render(f'Birds: {len(birds)}', False, (255, 255, 255))
+    return WATCH_EVERY > 0 and gen % WATCH_EVERY == 0
 
-    win.blit(score_text, (WIN_WIDTH - 10 - score_text.get_width(), 10))
-    win.blit(gen_text, (10, 10))
-    win.blit(num_of_birds_text, (10, 10 + gen_text.get_height()))
 
-    pipe_index = 0
-    if len(birds) > 0:
-        if len(pipes) > 1 and birds[0].x > pipes[0].x + pipes[0].PIPE_TOP.get_width():
-            pipe_index = 1
+def run(config_path):
+    global SEED, GEN
+
+    if ISLANDS > 1:
+        run_islands(config_path)
+        return
+
+    if RESUME:
+        p = neat.Checkpointer.restore_checkpoint(RESUME)
+        # A checkpoint holds the population bred at the end of its generation, which is the next generation. neat
+        # restores the number of the checkpointed one, it would be evaluated, checkpointed and reported under that again
+        p.generation += 1
+        GEN = p.generation
+        # neat also starts numbering genomes from 1 again, which would give children the keys of restored elites. The
+        # newest key in the population is the last one handed out
+        p.reproduction.genome_indexer = itertools.count(max(p.population) + 1)
+        if SEED is None:
+            SEED = getattr(p.config, 'course_seed', None)
+    else:
+        config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                                    neat.DefaultStagnation, config_path)
+        p = neat.Population(config)
+
+    if SEED is None:
+        SEED = random.randrange(2 ** 32)
+
+    # Saved inside every checkpoint, so a resumed run keeps flying the same courses
+    p.config.course_seed = SEED
+    print(f'Course seed: {SEED}')
+
+    if STOP_AT_THRESHOLD:
+        # End the generation as soon as a bird is certain to reach the threshold, neat then ends the run
+        POLICY.stop_at = p.config.fitness_threshold
 
-    for bird in birds:
-        bird.draw(win)
+    p.add_reporter(neat.StdOutReporter(True))
+    metrics_reporter = None
+    if METRICS:
+        metrics_reporter = metrics.MetricsReporter(METRICS, PROFILER, METRICS_HISTORY)
+        p.add_reporter(metrics_reporter)
+    else:
+        p.add_reporter(neat.StatisticsReporter())
+    if PROFILE:
+        p.add_reporter(profiling.ProfileReporter(PROFILER))
+    if CACHE is not None:
+        p.add_reporter(CACHE)
+
+    checkpointer = checkpoint.AsyncCheckpointer(CHECKPOINT_EVERY, filename_prefix=CHECKPOINT_PREFIX,
+                                                keep=CHECKPOINT_KEEP)
+    if CHECKPOINT_EVERY:
+        p.add_reporter(checkpointer)
+
+    if WORKERS:
+        evaluator_type = evaluation.SharedMemoryEvaluator if SHARED_MEMORY else evaluation.ParallelEvaluator
+        evaluator = evaluator_type(WORKERS, SEED, policy=POLICY, fixed_course=FIXED_COURSE, cache=CACHE,
+                                   courses=COURSES, how=AGGREGATE, schedule=SCHEDULE)
+        evaluator.generation = GEN
+        evaluator.profiler = PROFILER
+        winner = p.run(evaluator.evaluate, GENERATIONS)
+        evaluator.close()
+    else:
+        winner = p.run(main, GENERATIONS)
+
+    checkpointer.wait()
+    if metrics_reporter is not None:
+        metrics_reporter.close()
 
-        pygame.draw.line(win, (255, 255, 255), (200 + bird.img.get_width(), bird.y),
-                         (pipes[pipe_index].x, pipes[pipe_index].height), 3)
-        pygame.draw.line(win, (255, 255, 255), (200 + bird.img.get_width(), bird.y),
-                         (pipes[pipe_index].x, pipes[pipe_index].bottom_pipe_pos), 3)
+    pickle.dump(winner,open('winner.p','wb'))
 
-    ground.draw(win)
-    pygame.display.update()
 
+def run_islands(config_path):
+    global SEED
 
-def main(genomes, config):
-    global GEN
-    GEN += 1
-    nets = []
-    ge = []
-    birds = []
+    if SEED is None:
+        SEED = random.randrange(2 ** 32)
+    print(f'Course seed: {SEED}, island i flies the courses of seed + i')
 
-    for _, g in genomes:
-        net = neat.nn.FeedForwardNetwork.create(g, config)
-        nets.append(net)
-        birds.append(Bird(200, 280))
-        g.fitness = 0
-        ge.append(g)
+    settings = {'SEED': SEED, 'FIXED_COURSE': FIXED_COURSE, 'COURSES': COURSES, 'AGGREGATE': AGGREGATE,
+                'POLICY': POLICY, 'SCHEDULE': SCHEDULE, 'STOP_AT_THRESHOLD': STOP_AT_THRESHOLD}
+    winner = islands.run(config_path, ISLANDS, GENERATIONS, settings, TRANSPORT, MIGRATE_EVERY, MIGRANTS)
 
-    pipes = [Pipe(600)]
-    ground = Ground(680)
-    score = 0
-    win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
-    pygame.display.set_caption('Flappy Bird')
-    clock = pygame.time.Clock()
-
-    run = True
-    while run:
-        clock.tick(30)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                run = False
-                pygame.quit()
-                quit()
-
-        pipe_index = 0
-        if len(birds) > 0:
-            if len(pipes) > 1 and birds[0].x > pipes[0].x + pipes[0].PIPE_TOP.get_width():
-                pipe_index = 1
-        else:
-            break
-
-        for x, bird in enumerate(birds):
-            bird.move()
-            ge[x].fitness += 0.1
-
-            output = nets[x].activate(
-                (bird.y, abs(bird.y - pipes[pipe_index].height), abs(bird.y - pipes[pipe_index].bottom_pipe_pos)))
-
-            if output[0] > 0.5:
-                bird.jump()
-
-        rem = []
-        add_pipe = False
-
-        for pipe in pipes:
-            for bird in list(birds):
-                bird_index = birds.index(bird)
-                if pipe.collide(bird):
-                    ge[bird_index].fitness -= 1
-                    nets.pop(bird_index)
-                    ge.pop(bird_index)
-                    birds.remove(bird)
-
-                if not pipe.passed and pipe.x < bird.x:
-                    pipe.passed = True
-                    add_pipe = True
-
-            if pipe.x + pipe.PIPE_TOP.get_width() < 0:
-                rem.append(pipe)
-
-            pipe.move()
-
-        if add_pipe:
-            score += 1
-            for g in ge:
-                g.fitness += 5
-            pipes.append(Pipe(600))
-
-        for r in rem:
-            pipes.remove(r)
-
-        for bird in list(birds):
-            bird_index = birds.index(bird)
-            if bird.y + bird.img.get_height() >= 680 or bird.y < 0:
-                nets.pop(bird_index)
-                ge.pop(bird_index)
-                birds.remove(bird)
-
-        if score > 30:
-            break
-
-        ground.move()
-        draw_window(win, birds, pipes, ground, score, GEN)
+    pickle.dump(winner,open('winner.p','wb'))
 
 
-def run(config_path):
-    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
-                                neat.DefaultStagnation, config_path)
+def aggregate_arg(value):
+    if value in evaluation.AGGREGATES:
+        return value
 
-    p = neat.Population(config)
+    try:
+        quantile = float(value)
+    except ValueError:
+        quantile = -1
 
-    p.add_reporter(neat.StdOutReporter(True))
-    p.add_reporter(neat.StatisticsReporter())
+    if not 0 <= quantile <= 1:
+        raise argparse.ArgumentTypeError(f'expected one of {", ".join(evaluation.AGGREGATES)} or a quantile in [0, 1]')
 
-    winner = p.run(main, 10)
-    pickle.dump(winner,open('winner.p','wb'))
+    return quantile
 
 
 if __name__ == '__main__':
-    config_path = 'config.txt'
-    run(config_path)
+    parser = argparse.ArgumentParser(description='Train Flappy Bird agents with NEAT')
+    parser.add_argument('--config', default='config.txt')
+    parser.add_argument('--headless', action='store_true', help='train without a window or frame cap')
+    parser.add_argument('--watch-every', type=int, default=0, metavar='N',
+                        help='when headless, still show every Nth generation')
+    parser.add_argument('--seed', type=engine.seed_arg, help='seed for reproducible pipe courses')
+    parser.add_argument('--generations', type=int, default=10)
+    parser.add_argument('--checkpoint-every', type=int, default=1, metavar='N',
+                        help='checkpoint the population every N generations, 0 turns checkpoints off')
+    parser.add_argument('--keep-checkpoints', type=int, default=5, metavar='K')
+    parser.add_argument('--resume', metavar='CHECKPOINT', help='continue training from a checkpoint')
+    parser.add_argument('--frame-budget', type=int, metavar='N', help='simulate no genome for more than N frames')
+    parser.add_argument('--fitness-cap', type=float, help='stop simulating a bird once its fitness reaches this')
+    parser.add_argument('--stop-at-threshold', action='store_true',
+                        help='end training as soon as a bird is certain to reach fitness_threshold')
+    parser.add_argument('--profile', action='store_true', help='print per-phase timings after every generation')
+    parser.add_argument('--frames-per-render', type=engine.interval_arg, default=16, metavar='K',
+                        help='frames simulated per drawn frame at unlimited speed (key 4)')
+    parser.add_argument('--fixed-course', action='store_true', help='fly the same course in every generation')
+    parser.add_argument('--courses', type=int, default=1,
+                        help='score every genome on this many fixed courses, simulated as one batch')
+    parser.add_argument('--aggregate', default='mean', type=aggregate_arg,
+                        help='how the fitness over several courses is combined: mean, min, median or a quantile like 0.25')
+    parser.add_argument('--cache-mb', type=float, default=0, metavar='MB',
+                        help='cache the fitness of genomes already played on a course, '
+                             'needs --fixed-course or --courses to pay off')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='evaluate genomes on this many processes (implies --headless)')
+    parser.add_argument('--shared-memory', action='store_true',
+                        help='let the --workers simulate the birds in shared memory, for very large populations')
+    engine.DecisionScheduler.add_arguments(parser)
+    parser.add_argument('--islands', type=int, default=1, metavar='N',
+                        help='train N separate populations on their own processes that exchange their best genomes')
+    parser.add_argument('--migrate-every', type=int, default=islands.MIGRATE_EVERY, metavar='N',
+                        help='islands send their best genomes to the next island every N generations')
+    parser.add_argument('--migrants', type=int, default=islands.MIGRANTS,
+                        help='number of genomes an island sends each time')
+    parser.add_argument('--transport', choices=['queue', 'socket'], default='queue',
+                        help='how islands exchange genomes, socket uses TCP on localhost')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='append per-generation metrics to FILE as JSON lines, or as CSV if it ends in .csv')
+    parser.add_argument('--metrics-history', type=int, default=metrics.HISTORY, metavar='N',
+                        help='generations of metrics kept in memory')
+    args = parser.parse_args()
+    if args.islands > 1 and (args.workers or args.resume or args.cache_mb or args.metrics):
+        parser.error('--islands cannot be combined with --workers, --resume, --cache-mb or --metrics')
+    if args.cache_mb and args.stop_at_threshold:
+        parser.error('--cache-mb cannot be combined with --stop-at-threshold')
+    if args.profile and args.workers:
+        # The phases are timed in the worker processes, --metrics still reports the frames they simulated
+        parser.error('--profile cannot be combined with --workers, use --metrics for their throughput')
+
+    HEADLESS = args.headless
+    WATCH_EVERY = args.watch_every
+    SEED = args.seed
+    FIXED_COURSE = args.fixed_course
+    COURSES = args.courses
+    AGGREGATE = args.aggregate
+    WORKERS = args.workers
+    SHARED_MEMORY = args.shared_memory
+    ISLANDS = args.islands
+    MIGRATE_EVERY = args.migrate_every
+    MIGRANTS = args.migrants
+    TRANSPORT = args.transport
+    if args.cache_mb:
+        CACHE = evaluation.FitnessCache(int(args.cache_mb * 2 ** 20))
+    GENERATIONS = args.generations
+    CHECKPOINT_EVERY = args.checkpoint_every
+    CHECKPOINT_KEEP = args.keep_checkpoints
+    RESUME = args.resume
+    STOP_AT_THRESHOLD = args.stop_at_threshold
+    POLICY = engine.TerminationPolicy(frame_budget=args.frame_budget, fitness_cap=args.fitness_cap)
+    SPEED.frames_per_render = args.frames_per_render
+    PROFILE = args.profile
+    METRICS = args.metrics
+    METRICS_HISTORY = args.metrics_history
+    if args.profile or args.metrics:
+        PROFILER = profiling.Profiler()
+    SCHEDULE = engine.DecisionScheduler.from_args(args)
+
+    run(args.config)
@@ -0,0 +1,284 @@
+import argparse
+import itertools
+import multiprocessing
+import os
+import pickle
+import queue
+import random
+import threading
+import traceback
+from multiprocessing.connection import AuthenticationError, Client, Listener
+
+import neat
+from neat.reporting import BaseReporter
+
+import engine
+
+# Island-model training: several independent NEAT populations, one per process or machine, each running the usual
+# reproduction and speciation on its own. Every few generations an island sends copies of its best genomes to the next
+# island in a ring and takes in whatever the previous one sent. Nothing ever waits for another island, migrants that
+# arrive late just join a later generation, so a slow island never holds up the others.
+# Migrants travel through a transport: QueueTransport for processes on one machine, SocketTransport over TCP between
+# machines. Locally flappy_bird_ai.py --islands N starts N islands, on several machines every one of them runs
+#
+#   FLAPPY_ISLANDS_KEY=secret python islands.py --island I --peers host0:47000 host1:47000 host2:47000
+#
+# with the same --peers and the same secret everywhere, island I listening on the I-th address. Connections that don't
+# know the secret are refused
+
+PORT = 47000
+MIGRATE_EVERY = 5
+MIGRANTS = 2
+# The environment variable holding the secret of islands on several machines
+AUTHKEY_ENV = 'FLAPPY_ISLANDS_KEY'
+
+
+class QueueTransport:
+    # One multiprocessing.Queue inbox per island, for islands that are processes started from the same parent
+
+    def __init__(self, islands):
+        self.inboxes = [multiprocessing.Queue() for _ in range(islands)]
+
+    def open(self, island):
+        self.island = island
+        # A process must not hang on exit with migrants still queued for an island that already finished
+        for inbox in self.inboxes:
+            inbox.cancel_join_thread()
+
+    def send(self, island, genomes):
+        self.inboxes[island].put(genomes)
+
+    def receive(self):
+        migrants = []
+        while True:
+            try:
+                migrants += self.inboxes[self.island].get_nowait()
+            except queue.Empty:
+                return migrants
+
+    def close(self):
+        pass
+
+
+class SocketTransport:
+    # Island i listens on addresses[i], a (host, port) pair, and migrants are sent to it over TCP with
+    # multiprocessing.connection. Every connection has to prove it knows authkey, the secret all islands share, before
+    # anything it sends is unpickled. Migrants are sent on a background thread so a slow or unreachable island never
+    # holds up training, migrants for an island that isn't up yet or already finished are dropped
+
+    def __init__(self, addresses, authkey):
+        self.addresses = [tuple(address) for address in addresses]
+        self.authkey = authkey
+        self.listener = None
+
+    def __getstate__(self):
+        # Handed to the island processes before they open it, the listener belongs to the process that opened it
+        return {'addresses': self.addresses, 'authkey': self.authkey, 'listener': None}
+
+    def open(self, island):
+        self.inbox = queue.Queue()
+        self.stopped = threading.Event()
+        self.listener = Listener(self.addresses[island], authkey=self.authkey)
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                with self.listener.accept() as connection:
+                    self.inbox.put(connection.recv())
+            except (AuthenticationError, EOFError):
+                continue
+            except OSError:
+                if self.stopped.is_set():
+                    return
+
+    def send(self, island, genomes):
+        threading.Thread(target=self.deliver, args=(self.addresses[island], genomes), daemon=True).start()
+
+    def deliver(self, address, genomes):
+        try:
+            with Client(address, authkey=self.authkey) as connection:
+                connection.send(genomes)
+        except (AuthenticationError, EOFError, OSError):
+            pass
+
+    def receive(self):
+        migrants = []
+        while True:
+            try:
+                migrants += self.inbox.get_nowait()
+            except queue.Empty:
+                return migrants
+
+    def close(self):
+        if self.listener is not None:
+            self.stopped.set()
+            self.listener.close()
+            self.listener = None
+
+
+def adopt(config, population, species_set, migrants):
+    # Migrants take over the keys of the youngest genomes of the new generation, which are offspring nobody evaluated
+    # yet, elites keep their older keys. They join the species of the genome they replace until the next speciation
+    migrants = migrants[:len(population) // 2]
+    for key, migrant in zip(sorted(population)[-len(migrants):], migrants):
+        migrant.key = key
+        migrant.fitness = None
+        population[key] = migrant
+        species_set.species[species_set.genome_to_species[key]].members[key] = migrant
+
+    # Hidden nodes of migrants were numbered by another island, nodes added from now on are numbered past them
+    genome_config = config.genome_config
+    start = max(key for genome in population.values() for key in genome.nodes) + 1
+    if genome_config.node_indexer is not None:
+        start = max(start, next(genome_config.node_indexer))
+    genome_config.node_indexer = itertools.count(start)
+
+    return len(migrants)
+
+
+class Migration(BaseReporter):
+    # Sends the best `count` genomes of an island to the next one every `every` generations and brings the migrants
+    # received into the next generation. Prints one line per generation, in a single write since several islands share
+    # the terminal
+
+    def __init__(self, transport, island, islands, every=MIGRATE_EVERY, count=MIGRANTS):
+        self.transport = transport
+        self.island = island
+        self.islands = islands
+        self.every = every
+        self.count = count
+        self.generation = 0
+        self.received = 0
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def post_evaluate(self, config, population, species, best_genome):
+        print(f'Island {self.island} generation {self.generation}: best fitness {best_genome.fitness:.2f}, '
+              f'{len(species.species)} species, {self.received} migrants taken in so far\n', end='', flush=True)
+
+        if self.islands > 1 and self.every and (self.generation + 1) % self.every == 0:
+            best = sorted(population.values(), key=lambda g: g.fitness, reverse=True)[:self.count]
+            self.transport.send((self.island + 1) % self.islands, best)
+
+    def end_generation(self, config, population, species_set):
+        migrants = sorted(self.transport.receive(), key=lambda g: g.fitness, reverse=True)
+        if migrants:
+            self.received += adopt(config, population, species_set, migrants)
+
+
+def run_island(island, islands, transport, config_path, generations, settings, every=MIGRATE_EVERY,
+               count=MIGRANTS):
+    # Trains one island with flappy_bird_ai.main as the fitness function, headless. settings holds flappy_bird_ai
+    # globals to set first, like POLICY or COURSES. Every island flies its own courses, derived from SEED + island
+    import flappy_bird_ai
+
+    for name, value in settings.items():
+        setattr(flappy_bird_ai, name, value)
+    flappy_bird_ai.HEADLESS = True
+    flappy_bird_ai.WATCH_EVERY = 0
+    if flappy_bird_ai.SEED is None:
+        flappy_bird_ai.SEED = random.randrange(2 ** 32)
+    flappy_bird_ai.SEED = engine.offset_seed(flappy_bird_ai.SEED, island)
+
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                                neat.DefaultStagnation, config_path)
+    if flappy_bird_ai.STOP_AT_THRESHOLD:
+        flappy_bird_ai.POLICY.stop_at = config.fitness_threshold
+
+    p = neat.Population(config)
+    p.add_reporter(Migration(transport, island, islands, every, count))
+
+    transport.open(island)
+    try:
+        return p.run(flappy_bird_ai.main, generations)
+    finally:
+        transport.close()
+
+
+def island_process(results, *args):
+    # Sends back the winner, or the exception the island failed with so the parent doesn't wait for it forever
+    try:
+        result = run_island(*args)
+    except Exception as e:
+        traceback.print_exc()
+        result = e
+
+    results.put((args[0], result))
+
+
+def run(config_path, islands, generations, settings, transport='queue', every=MIGRATE_EVERY, count=MIGRANTS,
+        port=PORT):
+    # Trains `islands` islands in as many processes on this machine and returns the fittest of their winners.
+    # transport is 'queue', or 'socket' for islands talking TCP on localhost ports port, port + 1, ...
+    if transport == 'socket':
+        transport = SocketTransport([('127.0.0.1', port + i) for i in range(islands)], os.urandom(32))
+    else:
+        transport = QueueTransport(islands)
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=island_process,
+                                         args=(results, i, islands, transport, config_path, generations, settings,
+                                               every, count))
+                 for i in range(islands)]
+    for process in processes:
+        process.start()
+
+    winners = []
+    try:
+        while len(winners) < islands:
+            try:
+                island, winner = results.get(timeout=1)
+            except queue.Empty:
+                # An island that died without sending anything, like one that was killed, never will
+                for i, process in enumerate(processes):
+                    if process.exitcode not in (None, 0):
+                        raise RuntimeError(f'island {i} exited with code {process.exitcode}')
+                continue
+
+            if isinstance(winner, Exception):
+                raise winner
+
+            print(f'Island {island} finished, best fitness {winner.fitness:.2f}')
+            winners.append(winner)
+    finally:
+        # After a failure the other islands are stopped rather than left training
+        for process in processes:
+            if process.is_alive() and len(winners) < islands:
+                process.terminate()
+            process.join()
+
+    return max(winners, key=lambda g: g.fitness)
+
+
+def address(value):
+    host, _, port = value.rpartition(':')
+    return host, int(port)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train one island of an island-model NEAT run over TCP')
+    parser.add_argument('--island', type=int, required=True, help='index of this island in --peers')
+    parser.add_argument('--peers', type=address, nargs='+', required=True, metavar='HOST:PORT',
+                        help='addresses of all islands, in the same order on every machine')
+    parser.add_argument('--config', default='config.txt')
+    parser.add_argument('--generations', type=int, default=10)
+    parser.add_argument('--seed', type=engine.seed_arg, help='course seed, island I flies the courses of seed + I')
+    parser.add_argument('--migrate-every', type=int, default=MIGRATE_EVERY, metavar='N',
+                        help='send the best genomes to the next island every N generations')
+    parser.add_argument('--migrants', type=int, default=MIGRANTS, help='number of genomes sent each time')
+    args = parser.parse_args()
+    if not 0 <= args.island < len(args.peers):
+        parser.error('--island has to index --peers')
+    authkey = os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        parser.error(f'set {AUTHKEY_ENV} to a secret shared by all islands')
+
+    winner = run_island(args.island, len(args.peers), SocketTransport(args.peers, authkey.encode()), args.config,
+                        args.generations, {'SEED': args.seed}, args.migrate_every, args.migrants)
+
+    path = f'winner-island{args.island}.p'
+    with open(path, 'wb') as f:
+        pickle.dump(winner, f)
+    print(f'Saved the winner of island {args.island}, fitness {winner.fitness:.2f}, to {path}')
@@ -0,0 +1,81 @@
+import collections
+import csv
+import json
+import os
+import statistics
+import time
+
+from neat.reporting import BaseReporter
+
+import profiling
+
+# One compact row per generation, appended to a file as soon as the generation is evaluated, so a dashboard or
+# `tail -f` can follow a run while it trains. The file is newline-delimited JSON, or CSV when its name ends in .csv.
+# Rows are appended, a resumed run keeps writing to the same file. Unlike neat.StatisticsReporter only the last
+# `history` rows stay in memory, so week-long runs don't grow
+
+FIELDS = ['generation', 'time', 'best', 'mean', 'stdev', 'species', 'genomes', 'eval_s', 'bird_frames',
+          'bird_frames_per_s']
+HISTORY = 1000
+
+
+class MetricsReporter(BaseReporter):
+    # profiler is where the evaluation counts its bird_frames, without one the frame columns stay empty
+
+    def __init__(self, path, profiler=profiling.NULL_PROFILER, history=HISTORY):
+        self.path = path
+        self.csv = path.endswith('.csv')
+        self.profiler = profiler
+        self.history = collections.deque(maxlen=history)
+        self.generation = 0
+        self.start = time.perf_counter()
+
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'a', newline='')
+        self.writer = None
+        if self.csv:
+            self.writer = csv.DictWriter(self.file, FIELDS)
+            if new:
+                self.writer.writeheader()
+                self.file.flush()
+
+    def __getstate__(self):
+        # neat pickles the reporters with the species set into checkpoints, the file can't go with them
+        state = self.__dict__.copy()
+        state['file'] = state['writer'] = None
+        return state
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self.profiler.reset()
+        self.start = time.perf_counter()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        eval_s = time.perf_counter() - self.start
+        fitness = [g.fitness for g in population.values()]
+        bird_frames = self.profiler.counters.get('bird_frames', 0) if self.profiler.enabled else None
+
+        row = {
+            'generation': self.generation,
+            'time': round(time.time(), 3),
+            'best': best_genome.fitness,
+            'mean': statistics.fmean(fitness),
+            'stdev': statistics.pstdev(fitness),
+            'species': len(species.species),
+            'genomes': len(fitness),
+            'eval_s': round(eval_s, 4),
+            'bird_frames': bird_frames,
+            'bird_frames_per_s': round(bird_frames / eval_s, 1) if bird_frames is not None and eval_s else None,
+        }
+        self.history.append(row)
+
+        if self.csv:
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,152 @@
+import numpy as np
+import neat
+
+# The feed forward networks of a whole population packed into padded arrays, so one frame's decisions for every bird
+# are a handful of NumPy operations instead of a Python loop over every link of every network.
+# Network i evaluates its nodes in the same order as neat.nn.FeedForwardNetwork: node slot k of every network is
+# computed at step k from the inputs and the slots before it. Networks with fewer nodes leave their extra slots at
+# zero weight, and an output that is never evaluated reads the last column, which always stays 0 like in neat
+
+
+def sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0)))
+
+
+def tanh(z):
+    return np.tanh(np.clip(2.5 * z, -60.0, 60.0))
+
+
+def relu(z):
+    return np.where(z > 0.0, z, 0.0)
+
+
+def identity(z):
+    return z
+
+
+def clamped(z):
+    return np.clip(z, -1.0, 1.0)
+
+
+ACTIVATIONS = {
+    'sigmoid': sigmoid,
+    'tanh': tanh,
+    'relu': relu,
+    'identity': identity,
+    'clamped': clamped,
+}
+
+# Activations are stored per node slot as their index in here, -1 for unused slots
+ACTIVATION_NAMES = list(ACTIVATIONS)
+
+
+class BatchNetwork:
+    # Everything activate() needs is in these arrays, so a BatchNetwork can be rebuilt around copies of them
+    ARRAYS = ('weights', 'bias', 'response', 'outputs', 'kinds')
+
+    def __init__(self, nets, genomes, config):
+        genome_config = config.genome_config
+        self.num_inputs = len(genome_config.input_keys)
+        self.num_outputs = len(genome_config.output_keys)
+        self.num_slots = max([len(net.node_evals) for net in nets], default=0)
+        self.zero = self.num_inputs + self.num_slots
+
+        size = len(nets)
+        columns = self.zero + 1
+        self.weights = np.zeros((size, self.num_slots, columns))
+        self.bias = np.zeros((size, self.num_slots))
+        self.response = np.zeros((size, self.num_slots))
+        self.outputs = np.full((size, self.num_outputs), self.zero)
+
+        self.kinds = np.full((size, self.num_slots), -1, dtype=np.int8)
+
+        for i, (net, genome) in enumerate(zip(nets, genomes)):
+            column = {key: c for c, key in enumerate(net.input_nodes)}
+
+            for k, (node, _, _, bias, response, links) in enumerate(net.node_evals):
+                ng = genome.nodes[node]
+                if ng.aggregation != 'sum':
+                    raise ValueError(f'cannot compile aggregation {ng.aggregation!r}')
+
+                if ng.activation not in ACTIVATIONS:
+                    raise ValueError(f'cannot compile activation {ng.activation!r}')
+
+                column[node] = self.num_inputs + k
+                self.bias[i, k] = bias
+                self.response[i, k] = response
+                self.kinds[i, k] = ACTIVATION_NAMES.index(ng.activation)
+
+                for inode, weight in links:
+                    self.weights[i, k, column.get(inode, self.zero)] += weight
+
+            for o, key in enumerate(net.output_nodes):
+                self.outputs[i, o] = column.get(key, self.zero)
+
+        self.group_activations()
+
+    def group_activations(self):
+        # One (function, mask) pair per activation used, masks are None when every node uses the same one
+        kinds = np.unique(self.kinds[self.kinds >= 0])
+        if len(kinds) <= 1:
+            self.activations = [(ACTIVATIONS[ACTIVATION_NAMES[k]], None) for k in kinds]
+        else:
+            self.activations = [(ACTIVATIONS[ACTIVATION_NAMES[k]], self.kinds == k) for k in kinds]
+
+    def __len__(self):
+        return len(self.bias)
+
+    @classmethod
+    def create(cls, genomes, config):
+        nets = [neat.nn.FeedForwardNetwork.create(g, config) for g in genomes]
+        return cls(nets, genomes, config)
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays, num_inputs):
+        # A network working directly in arrays, as returned by arrays(), without copying them
+        net = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(net, name, arrays[name])
+
+        net.num_inputs = num_inputs
+        net.num_outputs = net.outputs.shape[1]
+        net.num_slots = net.bias.shape[1]
+        net.zero = num_inputs + net.num_slots
+        net.group_activations()
+        return net
+
+    def activate(self, inputs, index=None):
+        # inputs has one row per network in index (all networks by default), returns one row of outputs for each
+        if index is None:
+            index = np.arange(len(self))
+
+        inputs = np.asarray(inputs, dtype=np.float64)
+        values = np.zeros((len(index), self.zero + 1))
+        values[:, :self.num_inputs] = inputs
+
+        weights = self.weights[index]
+        bias = self.bias[index]
+        response = self.response[index]
+
+        for k in range(self.num_slots):
+            c = self.num_inputs + k
+            s = np.einsum('ij,ij->i', weights[:, k, :c], values[:, :c])
+            z = bias[:, k] + response[:, k] * s
+
+            for fn, mask in self.activations:
+                if mask is None:
+                    values[:, c] = fn(z)
+                else:
+                    m = mask[index, k]
+                    values[m, c] = fn(z[m])
+
+        return values[np.arange(len(index))[:, None], self.outputs[index]]
+
+    def decider(self):
+        # Decision function for engine.Game.step: a bird jumps when its network's first output is above 0.5
+        def decide(inputs, index):
+            return self.activate(inputs, index)[:, 0] > 0.5
+
+        return decide
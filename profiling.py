@@ -0,0 +1,87 @@
+import time
+
+from neat.reporting import BaseReporter
+
+# Per-phase timing for the generation loop. The loop calls lap(phase) at the end of every phase, which charges the
+# time since the previous lap to that phase, and count(name, n) for counters. NullProfiler has the same methods doing
+# nothing, so the calls can stay in the hot loop and cost next to nothing when profiling is off
+
+
+class Profiler:
+    enabled = True
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.phases = {}
+        self.counters = {}
+        self.last = time.perf_counter()
+
+    def start(self):
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self):
+        total = sum(self.phases.values())
+        frames = self.counters.get('frames', 0)
+        return {
+            'total_s': total,
+            'phases_s': dict(self.phases),
+            'counters': dict(self.counters),
+            'frames_per_s': frames / total if total else 0.0,
+            'birds_per_frame': self.counters.get('bird_frames', 0) / frames if frames else 0.0,
+        }
+
+
+class NullProfiler:
+    enabled = False
+
+    def reset(self):
+        pass
+
+    def start(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class ProfileReporter(BaseReporter):
+    # Resets the profiler at the start of every generation and prints where the evaluation time went
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def start_generation(self, generation):
+        self.profiler.reset()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        summary = self.profiler.summary()
+
+        total = summary['total_s']
+        phases = ', '.join(f'{phase} {t:.3f}s ({t / total if total else 0:.0%})' for phase, t in
+                           sorted(summary['phases_s'].items(), key=lambda item: -item[1]))
+        counters = summary['counters']
+
+        print(f'Profile: {counters.get("frames", 0)} frames at {summary["frames_per_s"]:.0f}/s, '
+              f'{summary["birds_per_frame"]:.1f} birds alive per frame, '
+              f'{counters.get("collision_tests", 0)} collision tests, {counters.get("collisions", 0)} collisions')
+        print(f'         {phases}')
+        if 'network_queries' in counters:
+            decisions = counters.get('bird_frames', 0)
+            print(f'         networks asked for {counters["network_queries"]} of {decisions} decisions '
+                  f'({counters["network_queries"] / decisions if decisions else 0:.0%})')
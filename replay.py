@@ -0,0 +1,178 @@
+import struct
+
+import numpy as np
+
+import engine
+
+# Compact recordings of a single bird game. The game is deterministic given its course and the frames the bird jumped
+# on, so a recording only keeps the course seed and one bit per frame. Every SNAPSHOT_INTERVAL frames the full game
+# state is stored as well, so a player can seek to any frame by restoring the snapshot before it and simulating the
+# rest, instead of simulating from the start. Recordings are played with the rules of best_bird.py: no score cap.
+#
+# File layout, little endian:
+#   header      magic, version, course seed, frames, score, snapshot interval, snapshot count
+#   jumps       ceil(frames / 8) bytes, one bit per frame in np.packbits order
+#   snapshots   one SNAPSHOT record each, followed by a PIPE record for each of its pipes
+
+MAGIC = b'FBRP'
+VERSION = 2
+SNAPSHOT_INTERVAL = 300
+
+HEADER = struct.Struct('<4sHQIIII')
+# frame, score, spawned, y, vel, tick_count, height, tilt, alive, retired, fitness, ground x1, x2, number of pipes
+SNAPSHOT = struct.Struct('<IIIddqdd??diiB')
+# x, passed
+PIPE = struct.Struct('<i?')
+
+
+def snapshot(game):
+    birds = game.birds
+    data = SNAPSHOT.pack(game.frame, game.score, game.pipes.spawned, birds.y[0], birds.vel[0], birds.tick_count[0],
+                         birds.height[0], birds.tilt[0], birds.alive[0], game.retired[0], game.fitness[0],
+                         game.ground.x1, game.ground.x2, len(game.pipes))
+
+    pipes = game.pipes
+    return data + b''.join(PIPE.pack(pipes.x[s], pipes.passed[s]) for s in pipes)
+
+
+def restore(game, data):
+    # Puts game into the state snapshot() saved, game has to be a single bird game on the same course
+    (game.frame, game.score, spawned, y, vel, tick_count, height, tilt, alive, retired, fitness, game.ground.x1,
+     game.ground.x2, num_pipes) = SNAPSHOT.unpack_from(data)
+
+    birds = game.birds
+    birds.y[0], birds.vel[0], birds.tick_count[0], birds.height[0], birds.tilt[0] = y, vel, tick_count, height, tilt
+    birds.alive[0] = alive
+    game.retired[0] = retired
+    game.fitness[0] = fitness
+    # Snapshots are only taken while the bird is alive, so it has been through every frame and pipe so far
+    game.scores[0] = game.score
+    game.lifetimes[0] = game.frame
+
+    # The pipes on screen are always the last ones spawned, their heights come from the course
+    pipes = game.pipes
+    pipes.clear()
+    pipes.spawned = spawned - num_pipes
+    for k in range(num_pipes):
+        x, passed = PIPE.unpack_from(data, SNAPSHOT.size + k * PIPE.size)
+        s = pipes.spawn(game.course.height(pipes.spawned), x)
+        pipes.passed[s] = passed
+
+
+def snapshot_size(data, offset=0):
+    num_pipes = SNAPSHOT.unpack_from(data, offset)[-1]
+    return SNAPSHOT.size + num_pipes * PIPE.size
+
+
+class Recording:
+    def __init__(self, seed, jumps=None, snapshots=None, score=0, interval=SNAPSHOT_INTERVAL):
+        self.seed = seed
+        self.jumps = [] if jumps is None else jumps
+        self.snapshots = [] if snapshots is None else snapshots
+        self.score = score
+        self.interval = interval
+
+    def __len__(self):
+        return len(self.jumps)
+
+    def to_bytes(self):
+        header = HEADER.pack(MAGIC, VERSION, self.seed, len(self.jumps), self.score, self.interval,
+                             len(self.snapshots))
+        jumps = np.packbits(np.asarray(self.jumps, dtype=bool)).tobytes()
+        return header + jumps + b''.join(self.snapshots)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, frames, score, interval, num_snapshots = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('not a replay file')
+        if version != VERSION:
+            raise ValueError(f'unsupported replay version {version}')
+
+        offset = HEADER.size
+        jump_bytes = (frames + 7) // 8
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=jump_bytes, offset=offset), count=frames)
+        offset += jump_bytes
+
+        snapshots = []
+        for _ in range(num_snapshots):
+            size = snapshot_size(data, offset)
+            snapshots.append(data[offset:offset + size])
+            offset += size
+
+        return cls(seed, bits.astype(bool).tolist(), snapshots, score, interval)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+class Recorder:
+    # Plays a single bird game through step() like Game.step, and records it
+
+    def __init__(self, game, interval=SNAPSHOT_INTERVAL):
+        if len(game.birds) != 1:
+            raise ValueError('only single bird games can be recorded')
+
+        self.game = game
+        self.recording = Recording(game.course.seed, interval=interval)
+
+    def step(self, decide):
+        game = self.game
+        recording = self.recording
+        if game.frame == len(recording.snapshots) * recording.interval:
+            recording.snapshots.append(snapshot(game))
+
+        def record(inputs, index):
+            jump = bool(np.asarray(decide(inputs, index))[0])
+            recording.jumps.append(jump)
+            return [jump]
+
+        alive = game.step(record)
+        recording.score = game.score
+        return alive
+
+
+class Player:
+    # Rebuilds the recorded game at any frame. game is the game at the current frame, step() advances it by one frame
+    # and seek() moves it to any frame in either direction
+
+    def __init__(self, recording, ground_type=engine.Ground):
+        self.recording = recording
+        self.jumps = np.asarray(recording.jumps, dtype=bool)
+        self.course = engine.Course(recording.seed)
+        self.ground_type = ground_type
+        self.game = None
+        self.seek(0)
+
+    def __len__(self):
+        return len(self.jumps)
+
+    def decide(self, inputs, index):
+        return self.jumps[self.game.frame:self.game.frame + 1]
+
+    def step(self):
+        if self.game.frame >= len(self.jumps):
+            return False
+
+        return self.game.step(self.decide)
+
+    def seek(self, frame):
+        frame = min(max(frame, 0), len(self.jumps))
+        k = min(frame // self.recording.interval, len(self.recording.snapshots) - 1)
+        start = k * self.recording.interval
+
+        # Going forward from the current frame is cheaper than restoring, as long as no snapshot lies in between
+        if self.game is None or not start <= self.game.frame <= frame:
+            self.game = engine.Game(1, ground_type=self.ground_type, course=self.course,
+                                    policy=engine.TerminationPolicy(max_score=None))
+            if k >= 0:
+                restore(self.game, self.recording.snapshots[k])
+
+        while self.game.frame < frame:
+            self.step()
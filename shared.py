@@ -0,0 +1,44 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Named NumPy arrays in one multiprocessing.shared_memory block. Pickling a SharedArrays only sends the block's name
+# and layout, so a worker process that receives one attaches to the same memory instead of getting a copy. The process
+# that created the block unlinks it once it is done with it, every process closes its own handle.
+# Worker processes have to share the resource tracker of the owner, so it has to be running before they start,
+# otherwise each worker starts its own tracker, which unlinks the block when the worker exits
+
+ALIGNMENT = 64
+
+
+class SharedArrays:
+    def __init__(self, layout, name=None):
+        # layout maps array names to (shape, dtype). Without a name a new block is created
+        self.layout = {key: (tuple(shape), np.dtype(dtype).str) for key, (shape, dtype) in layout.items()}
+        self.offsets = {}
+        size = 0
+        for key, (shape, dtype) in self.layout.items():
+            self.offsets[key] = size
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            size += -(-nbytes // ALIGNMENT) * ALIGNMENT
+
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=max(size, 1))
+        self.arrays = {key: np.ndarray(shape, dtype, buffer=self.shm.buf, offset=self.offsets[key])
+                       for key, (shape, dtype) in self.layout.items()}
+
+    def __reduce__(self):
+        return SharedArrays, (self.layout, self.shm.name)
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def __contains__(self, key):
+        return key in self.arrays
+
+    def close(self):
+        # Views into the block have to be gone before its handle can close
+        self.arrays = {}
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,91 @@
+import assets
+import engine
+
+# Drawable versions of the engine objects, shared by every script that opens a window
+
+
+class Bird(engine.Bird):
+    IMGS = assets.Asset('BIRD_IMGS')
+    MASKS = assets.Asset('BIRD_MASKS')
+    ANIMATION_RATE = 0.7
+
+    def __init__(self, x, y):
+        super().__init__(x, y)
+        self.img_index = 0
+        self.reverse_animate = False
+        self.frame = 0
+        self.img = self.IMGS[0]
+
+    def draw(self, win):
+        if self.reverse_animate:
+            self.img_index -= self.ANIMATION_RATE
+        else:
+            self.img_index += self.ANIMATION_RATE
+
+        if self.img_index >= 3:
+            self.reverse_animate = True
+            self.img_index = 2
+
+        elif self.img_index <= 0:
+            self.reverse_animate = False
+            self.img_index = 0
+
+        self.frame = int(self.img_index)
+
+        if self.tilt <= -80:
+            self.frame = 2
+            self.img_index = 2
+
+        self.img = self.IMGS[self.frame]
+
+        rotated_image = assets.rotated_bird(self.frame, self.tilt)
+        new_rect = rotated_image.get_rect(center=self.img.get_rect(topleft=(self.x, self.y)).center)
+        win.blit(rotated_image, new_rect.topleft)
+
+    def get_mask(self):
+        return self.MASKS[self.frame]
+
+
+class Pipe(engine.Pipe):
+    PIPE_TOP = assets.Asset('PIPE_TOP_IMG')
+    PIPE_BOTTOM = assets.Asset('PIPE_IMG')
+    TOP_MASK = assets.Asset('PIPE_TOP_MASK')
+    BOTTOM_MASK = assets.Asset('PIPE_BOTTOM_MASK')
+
+    def draw(self, win):
+        win.blit(self.PIPE_TOP, (self.x, self.top_pipe_pos))
+        win.blit(self.PIPE_BOTTOM, (self.x, self.bottom_pipe_pos))
+
+    def collide(self, bird):
+        bird_mask = bird.get_mask()
+        top_mask = self.TOP_MASK
+        bottom_mask = self.BOTTOM_MASK
+
+        top_offset = (self.x - bird.x, self.top_pipe_pos - round(bird.y))
+        bottom_offset = (self.x - bird.x, self.bottom_pipe_pos - round(bird.y))
+
+        # Returns None if there is no collision between bird mask and top mask
+        t_point = bird_mask.overlap(top_mask, top_offset)
+        b_point = bird_mask.overlap(bottom_mask, bottom_offset)
+
+        if t_point or b_point:
+            return True
+
+        return False
+
+
+def draw_pipes(win, pipes):
+    # Draws the pipes of an engine.PipeRing with a single course
+    for s in pipes:
+        x = pipes.x[s]
+        height = pipes.height[s, 0]
+        win.blit(Pipe.PIPE_TOP, (x, height - engine.PIPE_HEIGHT))
+        win.blit(Pipe.PIPE_BOTTOM, (x, height + Pipe.GAP))
+
+
+class Ground(engine.Ground):
+    IMG = assets.Asset('GROUND_IMG')
+
+    def draw(self, win):
+        win.blit(self.IMG, (self.x1, self.y))
+        win.blit(self.IMG, (self.x2, self.y))
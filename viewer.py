@@ -0,0 +1,78 @@
+import collections
+import copy
+import threading
+
+import numpy as np
+import pygame
+
+import controls
+
+# Watching training without slowing it down: the simulation runs on a background thread and publishes a snapshot of
+# what there is to draw into a LatestBuffer, which only ever holds the newest one. The window is drawn on the calling
+# thread at its own frame rate from whatever snapshot is newest, snapshots published in between are simply replaced.
+# The window thread never touches the game: drawing and the window's frame cap are off the simulation's path, and
+# nothing the window does can change the results. Only a speed picked with keys 1-3 slows the simulation down, on
+# purpose, by pacing it to 1x, 4x or 16x of controls.FPS frames per second; the default unlimited speed doesn't
+
+# What draw_window needs of a frame: the alive birds' indices with their y and tilt, copies of the pipes and ground
+Snapshot = collections.namedtuple('Snapshot', ['gen', 'score', 'index', 'y', 'tilt', 'pipes', 'ground'])
+
+
+def snapshot(game, gen):
+    index = np.flatnonzero(game.birds.alive)
+    return Snapshot(gen, game.score, index, game.birds.y[index], game.birds.tilt[index], copy.deepcopy(game.pipes),
+                    copy.copy(game.ground))
+
+
+class LatestBuffer:
+    # A one-slot buffer between two threads. publish() replaces whatever wasn't taken yet, take() empties the slot
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.item = None
+
+    def publish(self, item):
+        with self.lock:
+            self.item = item
+
+    def take(self):
+        with self.lock:
+            item, self.item = self.item, None
+        return item
+
+
+def watch(simulate, draw, buffer, speed, fps=controls.FPS):
+    # Runs simulate(stop) on a background thread, where it publishes snapshots to buffer, and meanwhile draws the
+    # newest one with draw(snapshot) at up to fps until simulate returns. speed gets the key presses.
+    # Closing the window sets stop, waits for simulate to return and quits
+    stop = threading.Event()
+    errors = []
+
+    def target():
+        try:
+            simulate(stop)
+        except BaseException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=target, name='simulation', daemon=True)
+    thread.start()
+
+    clock = pygame.time.Clock()
+    while thread.is_alive():
+        clock.tick(fps)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                stop.set()
+                thread.join()
+                pygame.quit()
+                quit()
+
+            speed.handle(event)
+
+        item = buffer.take()
+        if item is not None:
+            draw(item)
+
+    thread.join()
+    if errors:
+        raise errors[0]